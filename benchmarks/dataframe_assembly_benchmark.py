@@ -0,0 +1,83 @@
+'''
+Compares time of dataframe assembly in get_pse_data and fill_tge_dataframe with the old approach,
+which grew the dataframe row by row (df.loc[len(df)] = row) or window by window (pd.concat in a loop).
+Run from the main folder of the repository: python benchmarks/dataframe_assembly_benchmark.py
+'''
+import os
+import sys
+import time
+from datetime import date, timedelta
+import pandas as pd
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fetch_data  # noqa: E402
+from sample_data import create_pse_csv, create_rdn_html  # noqa: E402
+
+
+DAYS = [1, 30, 90, 365, 730]
+
+
+def fill_tge_dataframe_row_by_row(header, dates, gen_tge_data, row_min=2, row_max=26):
+    df = pd.DataFrame(columns=header)
+    for day, table in zip(dates, gen_tge_data):
+        for j in table.find_all('tr')[row_min:row_max]:
+            row = [i.text.strip() for i in j.find_all('td')]
+            row.insert(0, day)
+            df.loc[len(df)] = row
+    return df
+
+
+def concat_in_loop(contents):
+    for i, content in enumerate(contents):
+        if i == 0:
+            df = fetch_data.read_pse_csv(content)
+        else:
+            df = pd.concat(
+                [df, fetch_data.read_pse_csv(content)], ignore_index=True)
+    return df
+
+
+def concat_once(contents):
+    return pd.concat([fetch_data.read_pse_csv(content) for content in contents], ignore_index=True)
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def benchmark_tge(days):
+    table = BeautifulSoup(create_rdn_html('01-01-2022'), 'lxml').find(
+        'table', id='footable_kontrakty_godzinowe')
+    header = fetch_data.create_one_header(fetch_data.get_header(
+        table, 'th', colspan="2"), fetch_data.get_header(table, 'th', align=""))
+    dates = [(date(2022, 1, 1) + timedelta(days=i)).strftime('%d-%m-%Y')
+             for i in range(days)]
+    old = measure(fill_tge_dataframe_row_by_row,
+                  header, dates, [table] * days)
+    new = measure(fetch_data.fill_tge_dataframe,
+                  header, dates, [table] * days)
+    return old, new
+
+
+def benchmark_pse(days):
+    # one day windows, so the number of concatenated frames is the same as the number of days
+    contents = [create_pse_csv(date(2022, 1, 1) + timedelta(days=i), date(2022, 1, 1) + timedelta(days=i), units=10)
+                for i in range(days)]
+    return measure(concat_in_loop, contents), measure(concat_once, contents)
+
+
+def main():
+    print('{:>6} | {:>25} | {:>25}'.format(
+        'days', 'fill_tge_dataframe old/new [s]', 'get_pse_data old/new [s]'))
+    for days in DAYS:
+        tge_old, tge_new = benchmark_tge(days)
+        pse_old, pse_new = benchmark_pse(days)
+        print('{:>6} | {:>12.3f} / {:>8.3f} | {:>12.3f} / {:>8.3f}'.format(
+            days, tge_old, tge_new, pse_old, pse_new))
+
+
+if __name__ == '__main__':
+    main()
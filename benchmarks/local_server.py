@@ -0,0 +1,165 @@
+'''
+Local HTTP server which imitates www.pse.pl (csv exports) and tge.pl (RDN pages), used to run benchmarks without the websites.
+Responses are read from the folder with recorded responses if they are there, otherwise they are created by sample_data.
+Every response is sent after latency seconds. Run alone: python benchmarks/local_server.py --port 8000 --latency 0.05
+Path /__requests_log__ returns json list with [path, size, seconds] of every request handled since the last call.
+Responses have ETag header, requests with the same If-None-Match get status 304 without content. Responses are compressed
+with gzip if the request has Accept-Encoding with gzip (size in the log is the number of bytes sent).
+'''
+import argparse
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from sample_data import create_pse_csv, create_rdn_html
+
+
+PSE_PATH = re.compile(
+    r'^/getcsv/-/export/csv/(?P<source>[A-Z_]+)/data_od/(?P<start>\d{8})/data_do/(?P<end>\d{8})$')
+PSE_UNITS = {'PL_WYK_KSE': 1, 'PL_GEN_MOC_JW_EPS': 20}
+
+
+class LocalWebsiteHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        if url.path == '/__requests_log__':
+            self.send_log()
+            return
+        content, content_type = self.create_response(url)
+        etag = '"{}"'.format(hashlib.sha1(content).hexdigest())
+        time.sleep(self.server.latency)
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.server.record(url.path, 0, time.perf_counter() - start)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('ETag', etag)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            content = gzip.compress(content, compresslevel=5)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+        self.server.record(url.path, len(content), time.perf_counter() - start)
+
+    def send_log(self):
+        content = json.dumps(self.server.reset_log()).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def create_response(self, url):
+        recorded = self.read_recorded(url)
+        if url.path.startswith('/getcsv/'):
+            if recorded is not None:
+                return recorded, 'text/csv; charset=windows-1250'
+            match = PSE_PATH.match(url.path)
+            if match is None:
+                return create_pse_csv('2000-01-01', '1999-12-31'), 'text/csv; charset=windows-1250'
+            return (create_pse_csv(match['start'], match['end'], PSE_UNITS.get(match['source'], 1)),
+                    'text/csv; charset=windows-1250')
+        if recorded is not None:
+            return recorded, 'text/html; charset=utf-8'
+        day = parse_qs(url.query).get('dateShow', [''])[0]
+        if not re.match(r'^\d{2}-\d{2}-\d{4}$', day):
+            day = date.today().strftime('%d-%m-%Y')
+        return create_rdn_html(day), 'text/html; charset=utf-8'
+
+    def read_recorded(self, url):
+        '''
+        Returns recorded response saved in the folder of recordings as path with / replaced by _ and query
+        (e.g. getcsv_-_export_csv_PL_WYK_KSE_data_od_20221202_data_do_20221203 or energia-elektryczna-rdn_dateShow=02-12-2022).
+        '''
+        if not self.server.recordings:
+            return None
+        name = url.path.strip('/').replace('/', '_')
+        if url.query:
+            name += '_' + url.query
+        path = os.path.join(self.server.recordings, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalWebsiteServer(ThreadingHTTPServer):
+    '''
+    Server with LocalWebsiteHandler. Latency is the delay of every response in seconds, recordings is the folder
+    with recorded responses. Size and handling time of every response is saved in requests_log.
+    '''
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0, recordings=None):
+        super().__init__(('127.0.0.1', port), LocalWebsiteHandler)
+        self.latency = latency
+        self.recordings = recordings
+        self.lock = threading.Lock()
+        self.requests_log = []
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.server_address[1])
+
+    def record(self, path, size, seconds):
+        with self.lock:
+            self.requests_log.append((path, size, seconds))
+
+    def reset_log(self):
+        with self.lock:
+            log, self.requests_log = self.requests_log, []
+        return log
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+def serve(port, latency, recordings, ports):
+    server = LocalWebsiteServer(port, latency, recordings)
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_server_process(port=0, latency=0, recordings=None):
+    '''
+    Starts LocalWebsiteServer in a separate process, so the server does not slow down and does not use memory
+    of the measured process. Returns tuple (process, url of the server).
+    '''
+    ports = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(port, latency, recordings, ports), daemon=True)
+    process.start()
+    return process, 'http://127.0.0.1:{}'.format(ports.get(timeout=30))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--recordings', type=str, default=None)
+    args = parser.parse_args()
+    server = LocalWebsiteServer(args.port, args.latency, args.recordings)
+    print('Serving on {} (FETCH_DATA_PSE_URL and FETCH_DATA_TGE_URL)'.format(server.url))
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+'''
+Measures the hourly panel (build_panel and update_panel) on the local copy of the websites (see local_server.py).
+For every range of days the full panel is built and saved, then it is updated with one more day (only the last saved day
+and the new day are downloaded). Time of the whole run, number of requests and time of stages (parsing, normalizing
+is part of the parse stages, join) are reported. TGE data is available only for the last 3 months, so ranges end yesterday
+and are not longer than 90 days.
+Run from the main folder of the repository: python benchmarks/panel_benchmark.py --days 30 60 90 --latency 0.02
+'''
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fetch_data  # noqa: E402
+from local_server import start_server_process  # noqa: E402
+
+
+def measure(function, *args):
+    stats = fetch_data.FetchStats()
+    fetcher = fetch_data.Fetcher(fetch_data.create_session(args[-1]), hooks=stats)
+    start = time.perf_counter()
+    result = function(*args[:-1], fetcher=fetcher, workers=args[-1])
+    return time.perf_counter() - start, result, stats.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, nargs='+', default=[30, 60, 90])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.02, help='delay of every response in seconds')
+    parser.add_argument('--generation', action='store_true', help='add source 2 to the panel')
+    args = parser.parse_args()
+
+    server_process, server_url = start_server_process(latency=args.latency)
+    os.environ['FETCH_DATA_PSE_URL'] = server_url
+    os.environ['FETCH_DATA_TGE_URL'] = server_url
+    today = date.today()
+    with tempfile.TemporaryDirectory() as folder:
+        for days in args.days:
+            date_to = today - timedelta(days=2)
+            date_from = (date_to - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+            file_path = os.path.join(folder, 'panel_{}.parquet'.format(days))
+            for name, function, function_args in [
+                    ('build', fetch_data.update_panel, (file_path, date_to.strftime('%Y-%m-%d'), date_from)),
+                    ('update +1 day', fetch_data.update_panel, (file_path, (today - timedelta(days=1)).strftime('%Y-%m-%d')))]:
+                seconds, rows, summary = measure(function, *function_args, args.generation, args.workers)
+                stages = ', '.join('{} {:.3f} s'.format(stage, values['seconds'])
+                                   for stage, values in sorted(summary['stages'].items()))
+                print('{:>3} days {:<14} {:>8.3f} s {:>6} hours {:>5} req | {}'.format(
+                    days, name, seconds, rows, summary['requests'], stages))
+    server_process.terminate()
+
+
+if __name__ == '__main__':
+    main()
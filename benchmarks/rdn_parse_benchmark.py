@@ -0,0 +1,79 @@
+'''
+Compares parse throughput of the RDN table: BeautifulSoup path (parse_tge_table, get_header, create_one_header,
+fill_tge_dataframe) and lxml path (extract_rdn_table, create_rdn_dataframe). Both paths have to give the same dataframe.
+Then the lxml path is measured with pages parsed in pools of --processes processes (see create_parse_pool), 
+it has to give the same dataframe as parsing in the main process.
+Run from the main folder of the repository: python benchmarks/rdn_parse_benchmark.py --processes 2 4
+'''
+import argparse
+import functools
+import os
+import sys
+import time
+from datetime import date, timedelta
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fetch_data  # noqa: E402
+from sample_data import create_rdn_html  # noqa: E402
+
+
+DAYS = 90
+
+
+def parse_with_soup(dates, pages, statistics):
+    tables = [fetch_data.parse_tge_table(page, 'table', 'footable_kontrakty_godzinowe')
+              for page in pages]
+    header = fetch_data.create_one_header(fetch_data.get_header(
+        tables[0], 'th', colspan="2"), fetch_data.get_header(tables[0], 'th', align=""))
+    return fetch_data.fill_tge_dataframe(header, dates, iter(tables), statistics=statistics)
+
+
+def parse_with_lxml(dates, pages, statistics):
+    tables = (fetch_data.extract_rdn_table(page, statistics=statistics)
+              for page in pages)
+    return fetch_data.create_rdn_dataframe(dates, tables)
+
+
+def parse_in_processes(dates, pages, statistics, processes):
+    extract = functools.partial(fetch_data.extract_rdn_table, statistics=statistics)
+    with fetch_data.create_parse_pool(processes) as process_pool:
+        # start processes (and import fetch_data in them) before time is measured
+        list(process_pool.map(extract, pages[:processes]))
+        start = time.perf_counter()
+        df = fetch_data.create_rdn_dataframe(dates, process_pool.map(extract, pages))
+        return time.perf_counter() - start, df
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, nargs='+', default=[2, 4])
+    args = parser.parse_args()
+    days = [date(2022, 1, 1) + timedelta(days=i) for i in range(DAYS)]
+    dates = [day.strftime('%d-%m-%Y') for day in days]
+    pages = [create_rdn_html(day) for day in dates]
+    megabytes = sum(len(page) for page in pages) / 1e6
+    print('{} pages, {:.1f} MB'.format(len(pages), megabytes))
+    for statistics in [False, True]:
+        soup_time, soup_df = measure(
+            parse_with_soup, dates, pages, statistics)
+        lxml_time, lxml_df = measure(
+            parse_with_lxml, dates, pages, statistics)
+        pd.testing.assert_frame_equal(soup_df, lxml_df)
+        print('statistics={!s:<5} BeautifulSoup: {:.3f} s ({:.0f} pages/s) | lxml: {:.3f} s ({:.0f} pages/s) | speedup {:.1f}x'.format(
+            statistics, soup_time, DAYS / soup_time, lxml_time, DAYS / lxml_time, soup_time / lxml_time))
+        for processes in args.processes:
+            processes_time, processes_df = parse_in_processes(dates, pages, statistics, processes)
+            pd.testing.assert_frame_equal(lxml_df, processes_df)
+            print('statistics={!s:<5} lxml in {} processes: {:.3f} s ({:.0f} pages/s) | speedup {:.1f}x'.format(
+                statistics, processes, processes_time, DAYS / processes_time, lxml_time / processes_time))
+
+
+if __name__ == '__main__':
+    main()
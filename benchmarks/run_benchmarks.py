@@ -0,0 +1,181 @@
+'''
+Offline benchmark suite. Starts LocalWebsiteServer in a separate process (local copy of www.pse.pl and tge.pl with configurable latency) and measures:
+ - get_pse_data for sources 1 and 2,
+ - get_data_tge with fill_tge_dataframe,
+ - download_data end to end (sources 1, 2 and 3, for source 3 only ranges up to 90 days, because of check_tge_date_conditions),
+over ranges of 1, 30, 365 and 1000 days. For every case time, number of requests, downloaded MB, throughput (days/s, MB/s),
+server latency percentiles (p50, p90, p99) and peak memory (tracemalloc, measured in a second run) are reported.
+Download_data needs date_from below date_to for sources 1 and 2, so the 1 day range of these sources has 2 days.
+
+Results can be saved with --json and compared with saved results with --compare, then the script ends with exit code 1
+if any case is slower than the saved one by more than --tolerance (default 0.25 = 25%).
+Run from the main folder of the repository: python benchmarks/run_benchmarks.py --latency 0.02 --workers 4
+'''
+import argparse
+import json
+import urllib.request
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from click.testing import CliRunner
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fetch_data  # noqa: E402
+from local_server import start_server_process  # noqa: E402
+
+
+START = date(2020, 1, 1)
+TGE_MAX_DAYS = 90
+
+
+def percentile(values, q):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def read_requests_log(server_url):
+    with urllib.request.urlopen(server_url + '/__requests_log__') as response:
+        return json.loads(response.read())
+
+
+def measure_peak_memory(function):
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def run_case(server_url, name, days, function, memory=True):
+    read_requests_log(server_url)
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    log = read_requests_log(server_url)
+    # tracemalloc slows down allocations a lot, so peak memory is measured in a separate run
+    peak = measure_peak_memory(function) if memory else 0
+    read_requests_log(server_url)
+    latencies = [latency for _, _, latency in log]
+    megabytes = sum(size for _, size, _ in log) / 1024 ** 2
+    return {'case': name, 'days': days, 'seconds': round(seconds, 4), 'requests': len(log),
+            'megabytes': round(megabytes, 3), 'days_per_second': round(days / seconds, 2),
+            'megabytes_per_second': round(megabytes / seconds, 3),
+            'latency_p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'latency_p90_ms': round(percentile(latencies, 90) * 1000, 2),
+            'latency_p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'peak_memory_mb': round(peak / 1024 ** 2, 2)}
+
+
+def benchmark_get_pse_data(number, days, workers):
+    url_base = fetch_data.get_url_base_link(number)
+    date_to = START + timedelta(days=days - 1)
+    if days == 1:
+        periods = [fetch_data.pd.Timestamp(START)] * 2
+    else:
+        periods = fetch_data.create_data_periods(
+            START.strftime('%Y-%m-%d'), date_to.strftime('%Y-%m-%d'), 31)
+    fetcher = fetch_data.Fetcher(fetch_data.create_session(workers))
+    return lambda: fetch_data.get_pse_data(url_base, periods, workers, fetcher)
+
+
+def benchmark_get_data_tge(days, workers):
+    url_base = fetch_data.get_url_base_link(3)
+    dates = [(START + timedelta(days=i)).strftime('%d-%m-%Y')
+             for i in range(days)]
+    fetcher = fetch_data.Fetcher(fetch_data.create_session(workers))
+
+    def run():
+        find, find_id = fetch_data.get_find_variables()
+        tables = fetch_data.get_data_tge(
+            dates, url_base, find, find_id, fetcher, workers)
+        first_table = next(tables)
+        header = fetch_data.create_one_header(fetch_data.get_header(
+            first_table, 'th', colspan="2"), fetch_data.get_header(first_table, 'th', align=""))
+        tables = iter([first_table] + list(tables))
+        return fetch_data.fill_tge_dataframe(header, dates, tables)
+    return run
+
+
+def benchmark_download_data(number, days, workers, folder):
+    if number == 3:
+        date_to = date.today() - timedelta(days=1)
+        date_from = date_to - timedelta(days=days - 1)
+    else:
+        date_from = START
+        date_to = START + timedelta(days=max(days - 1, 1))
+    args = ['--number', str(number), '--date_from', date_from.strftime('%Y-%m-%d'),
+            '--date_to', date_to.strftime('%Y-%m-%d'), '--folder_path', folder,
+            '--workers', str(workers), '--rate_limit', '0', '--no_cache']
+
+    def run():
+        result = CliRunner().invoke(fetch_data.download_data, args, input='\n' * 5)
+        if result.exit_code != 0:
+            raise RuntimeError('download_data failed: {}'.format(result.output)) from result.exception
+    return run
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path, encoding='utf-8') as file:
+        baseline = {(case['case'], case['days']): case for case in json.load(file)['results']}
+    regressions = []
+    for case in results:
+        saved = baseline.get((case['case'], case['days']))
+        if saved is not None and case['seconds'] > saved['seconds'] * (1 + tolerance):
+            regressions.append('{} ({} days): {:.3f} s, before {:.3f} s'.format(
+                case['case'], case['days'], case['seconds'], saved['seconds']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, nargs='+', default=[1, 30, 365, 1000])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.02, help='delay of every response in seconds')
+    parser.add_argument('--recordings', type=str, default=None, help='folder with recorded responses')
+    parser.add_argument('--json', type=str, default=None, help='save results to the json file')
+    parser.add_argument('--compare', type=str, default=None, help='json file with results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--no_memory', action='store_true', help='do not measure peak memory (every case is run once)')
+    args = parser.parse_args()
+
+    server_process, server_url = start_server_process(latency=args.latency, recordings=args.recordings)
+    os.environ['FETCH_DATA_PSE_URL'] = server_url
+    os.environ['FETCH_DATA_TGE_URL'] = server_url
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for days in args.days:
+            cases = [('get_pse_data PL_WYK_KSE', benchmark_get_pse_data(1, days, args.workers)),
+                     ('get_pse_data PL_GEN_MOC_JW_EPS', benchmark_get_pse_data(2, days, args.workers)),
+                     ('get_data_tge + fill_tge_dataframe', benchmark_get_data_tge(days, args.workers)),
+                     ('download_data 1', benchmark_download_data(1, days, args.workers, folder)),
+                     ('download_data 2', benchmark_download_data(2, days, args.workers, folder))]
+            if days <= TGE_MAX_DAYS:
+                cases.append(('download_data 3', benchmark_download_data(3, days, args.workers, folder)))
+            for name, function in cases:
+                result = run_case(server_url, name, days, function, not args.no_memory)
+                results.append(result)
+                print('{case:<34} {days:>5} days {seconds:>8.3f} s {requests:>5} req {megabytes:>8.2f} MB '
+                      '{days_per_second:>9.1f} days/s  p50/p90/p99 {latency_p50_ms}/{latency_p90_ms}/{latency_p99_ms} ms '
+                      'peak {peak_memory_mb} MB'.format(**result))
+    server_process.terminate()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({'workers': args.workers, 'latency': args.latency, 'results': results}, file, indent=2)
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+'''
+Synthetic data in the same format as the data served by www.pse.pl and tge.pl.
+Used by the benchmarks, so they can be run without connection to the websites.
+'''
+import pandas as pd
+
+
+RDN_TOP_HEADERS = ['Fixing I', 'Fixing II', 'Notowania ciągłe']
+RDN_BOTTOM_HEADERS = ['Kurs (PLN/MWh)', 'Wolumen (MWh)']
+
+
+def create_pse_csv(start, end, units=1):
+    '''
+    Returns csv file (bytes, cp1250, separated with ;) with hourly data between start and end.
+    If units is higher than 1, every hour has one row for every generating unit (like PL_GEN_MOC_JW_EPS).
+    '''
+    day_rows = '\n'.join('{{day}};{};JW{:03d};{},{};{},{}'.format(
+        hour, unit, 15000 + hour * 10, hour % 10, 1200 + unit, hour % 7) for hour in range(1, 25) for unit in range(units))
+    rows = ['Data;Godz.;Kod;Krajowe zapotrzebowanie na moc;Sumaryczna generacja źródeł wiatrowych']
+    for day in pd.date_range(start, end, freq='D'):
+        rows.append(day_rows.replace('{day}', day.strftime('%Y%m%d')))
+    return '\n'.join(rows).encode('cp1250')
+
+
+def create_rdn_html(day, hours=24):
+    '''
+    Returns html page (bytes) with table footable_kontrakty_godzinowe for one day, like tge.pl/energia-elektryczna-rdn.
+    Table has two-row header, one row for every hour and Min, Max, Suma rows at the end.
+    '''
+    top = ''.join('<th colspan="2" class="text-center">{}</th>'.format(title)
+                  for title in RDN_TOP_HEADERS)
+    bottom = ''.join('<th align="">{}</th>'.format(title)
+                     for _ in RDN_TOP_HEADERS for title in RDN_BOTTOM_HEADERS)
+    rows = []
+    for hour in range(hours):
+        cells = ['{}-{}'.format(hour, hour + 1)]
+        for i in range(len(RDN_TOP_HEADERS)):
+            cells.append('{},{:02d}'.format(500 + hour * 3 + i, hour))
+            cells.append('{} {:03d},{}'.format(1 + i, hour * 7, hour % 10))
+        rows.append('<tr>' + ''.join('<td class="text-right">\n  {}\n</td>'.format(cell)
+                                     for cell in cells) + '</tr>')
+    for label in ['Min', 'Max', 'Suma']:
+        cells = [label] + ['{},00'.format(100 + i) for i in range(2 * len(RDN_TOP_HEADERS))]
+        rows.append('<tr class="summary">' +
+                    ''.join('<td>{}</td>'.format(cell) for cell in cells) + '</tr>')
+    page = '''<!DOCTYPE html>
+<html lang="pl"><head><meta charset="utf-8"><title>RDN {day}</title></head>
+<body><div class="container">
+<table id="footable_kontrakty_godzinowe" class="footable table table-hover">
+<thead>
+<tr><th align="left">Dane dla {day}</th>{top}</tr>
+<tr><th align="">&nbsp;</th><th align="">Czas</th>{bottom}</tr>
+</thead>
+<tbody>
+{rows}
+</tbody>
+</table>
+</div></body></html>'''.format(day=day, top=top, bottom=bottom, rows='\n'.join(rows))
+    return page.encode('utf-8')
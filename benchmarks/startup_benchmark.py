@@ -0,0 +1,47 @@
+'''
+Measures startup time of the CLI: every case is run in a new python process (like the console script) and the median
+time of --runs runs is reported. Cases end before anything is downloaded (help, missing option with --no_input, wrong dates),
+so they show how long scripts wait for the command itself. Import of pandas is measured for comparison.
+Run from the main folder of the repository: python benchmarks/startup_benchmark.py --runs 10
+'''
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUN_COMMAND = 'import sys, fetch_data; fetch_data.download_data(sys.argv[1:])'
+CASES = [
+    ('python', ['-c', 'pass']),
+    ('import pandas', ['-c', 'import pandas']),
+    ('import fetch_data', ['-c', 'import fetch_data']),
+    ('download_data --help', ['-c', RUN_COMMAND, '--help']),
+    ('missing option (--no_input)', ['-c', RUN_COMMAND, '--no_input']),
+    ('wrong dates (--no_input)', ['-c', RUN_COMMAND, '--no_input', '-n', '1', '-df', '2022-12-03', '-dt', '2022-12-02']),
+    ('wrong source (--no_input)', ['-c', RUN_COMMAND, '--no_input', '-n', '4', '-df', '2022-12-02', '-dt', '2022-12-03']),
+]
+
+
+def measure(args, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       stdin=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+    for name, case_args in CASES:
+        print('{:<30} {:>8.1f} ms'.format(name, measure(case_args, args.runs) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,41 @@
 import os
 import click
-from bs4 import BeautifulSoup
-import pandas as pd
 from datetime import date, datetime, timedelta
-from dateutil.relativedelta import relativedelta
+import importlib
 import math
 import collections
-import requests
+import contextlib
+import functools
+import hashlib
+import itertools
+import json
+import sqlite3
+import threading
+import time
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+
+class LazyModule:
+    '''
+    Module imported at the first use of any of its attributes. Heavy modules (pandas, requests, bs4, lxml, dateutil)
+    are imported only when they are needed, so e.g. --help or wrong parameters do not wait for them.
+    '''
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attribute):
+        return getattr(importlib.import_module(self._name), attribute)
+
+
+pd = LazyModule('pandas')
+requests = LazyModule('requests')
+bs4 = LazyModule('bs4')
+lxml_html = LazyModule('lxml.html')
+dateutil_relativedelta = LazyModule('dateutil.relativedelta')
 
 
 def get_url_base_link(number):
@@ -16,33 +45,42 @@ def get_url_base_link(number):
     2 - Praca KSE - Generacja mocy Jednostek Wytwórczych
     3 - TGE RDN - Kontrakty godzinowe 
     Returns url.
+    Addresses of the websites can be changed with environment variables FETCH_DATA_PSE_URL and FETCH_DATA_TGE_URL
+    (e.g. http://127.0.0.1:8000 for a local copy of the website used in benchmarks).
     '''
+    pse_url = os.environ.get('FETCH_DATA_PSE_URL', 'https://www.pse.pl')
+    tge_url = os.environ.get('FETCH_DATA_TGE_URL', 'https://tge.pl')
     if number == 1:
-        url_base = 'https://www.pse.pl/getcsv/-/export/csv/PL_WYK_KSE/data_od/{}/data_do/{}'
+        url_base = pse_url + '/getcsv/-/export/csv/PL_WYK_KSE/data_od/{}/data_do/{}'
     elif number == 2:
-        url_base = 'https://www.pse.pl/getcsv/-/export/csv/PL_GEN_MOC_JW_EPS/data_od/{}/data_do/{}'
+        url_base = pse_url + '/getcsv/-/export/csv/PL_GEN_MOC_JW_EPS/data_od/{}/data_do/{}'
     elif number == 3:
-        url_base = 'https://tge.pl/energia-elektryczna-rdn?dateShow={}'
+        url_base = tge_url + '/energia-elektryczna-rdn?dateShow={}'
     else:
         raise Exception("Wrong selection. Choose one option from the list.")
     return url_base
 
 
-def check_connection(url, timeout=5):
+def check_connection(url, timeout=5, retries=0, backoff=1):
     '''
     Checks the connection with the url. If something is wrong, raise error.
+    Connection errors, timeouts and responses with status 429 or 5xx are retried up to retries times (see Fetcher.request).
     '''
-    try:
-        r = requests.get(url, timeout=timeout)
-        r.raise_for_status()
-    except requests.exceptions.HTTPError as errh:
-        raise errh
-    except requests.exceptions.ConnectionError as errc:
-        raise errc
-    except requests.exceptions.Timeout as errt:
-        raise errt
-    except requests.exceptions.RequestException as err:
-        raise err
+    Fetcher(requests.Session(), timeout=timeout,
+            retries=retries, backoff=backoff).request(url)
+
+
+def check_connections(numbers, timeout=5, retries=0):
+    '''
+    Checks connection (see check_connection) to the website of every source from numbers, every website is checked once.
+    '''
+    checked_hosts = set()
+    for number in numbers:
+        url = get_url_base_link(number)
+        host = urlsplit(url).netloc
+        if host not in checked_hosts:
+            check_connection(url, timeout, retries)
+            checked_hosts.add(host)
 
 
 def check_dates(date_from, date_to):
@@ -53,6 +91,25 @@ def check_dates(date_from, date_to):
     return datetime.strptime(date_from, '%Y-%m-%d') < datetime.strptime(date_to, '%Y-%m-%d')
 
 
+def validate_dates(number, date_from, date_to):
+    '''
+    Checks format (YYYY-MM-DD) and order of dates for the source selected by number before anything is downloaded.
+    For source 3 the limit of 3 months is checked later (see check_tge_date_conditions), because it depends on the cache.
+    Raises error if dates are wrong.
+    '''
+    try:
+        if number in (1, 2):
+            correct = check_dates(date_from, date_to)
+        else:
+            correct = datetime.strptime(date_from, '%Y-%m-%d') <= datetime.strptime(date_to, '%Y-%m-%d')
+    except ValueError:
+        raise Exception("Wrong format of dates. Paste dates in format YYYY-MM-DD.")
+    if not correct:
+        if number in (1, 2):
+            raise Exception("Wrong dates. Date_from should be below date_to.")
+        raise Exception("Check the dates. Date_from should be below or equal to date_to.")
+
+
 def create_data_periods(date_from, date_to, max_period_days=1):
     '''
     Create list with dates between date_from and date_to and returns list.
@@ -74,22 +131,799 @@ def create_data_periods(date_from, date_to, max_period_days=1):
     return periods_list
 
 
-def get_pse_data(url_base, periods_list):
+def create_session(pool_size=10):
     '''
-    Download data from website (www.pse.pl). Url_base is filled with dates from periods_list, 
-    then data is downloaded and concatenated into one dataframe. Returns dataframe.
+    Creates requests.Session which keeps up to pool_size open connections to every host.
+    Pool_size should be at least the number of threads using the session. Responses are compressed (gzip or deflate) 
+    if the server supports it, requests decompresses them. Returns session.
+    '''
+    session = requests.Session()
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class RateLimiter:
     '''
+    Limits the number of requests sent to one host. Requests to the same host are spaced by at least
+    1 / max_per_second seconds, no matter how many threads are sending them.
+    If max_per_second is None or 0, requests are not limited.
+    '''
+
+    def __init__(self, max_per_second=None):
+        self.max_per_second = max_per_second
+        self.lock = threading.Lock()
+        self.next_request_time = {}
+
+    def wait(self, url):
+        '''
+        Blocks until the next request to the host of the url can be sent.
+        '''
+        if not self.max_per_second:
+            return
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            request_time = max(now, self.next_request_time.get(host, now))
+            self.next_request_time[host] = request_time + 1 / self.max_per_second
+        time.sleep(request_time - now)
+
+
+class ResponseCache:
+    '''
+    Cache of downloaded responses saved in folder cache_dir. Every response is saved in file <key>.bin, where key is created
+    from the url (url contains number of the source and date or period of the data), and described in file <key>.json.
+    Responses with data only for days older than immutable_days are never downloaded again.
+    Responses with more recent data (or unknown last day) are downloaded again if they are older than recent_ttl seconds.
+    If size of all saved responses is higher than max_size bytes, least recently used responses are removed.
+    Validators of responses (ETag and Last-Modified headers) are saved too, so responses which have to be downloaded again
+    can be requested with conditional headers (see get_conditional_headers) and refreshed if they did not change.
+    '''
+
+    def __init__(self, cache_dir, max_size=500 * 1024 ** 2, recent_ttl=3600, immutable_days=2):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.recent_ttl = recent_ttl
+        self.immutable_days = immutable_days
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.size = sum(os.path.getsize(path) for path in self.get_files())
+
+    def get_files(self):
+        '''
+        Returns list of paths to all saved responses.
+        '''
+        return [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.bin')]
+
+    def get_path(self, url, extension):
+        '''
+        Returns path to the file with extension for the url.
+        '''
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + extension)
+
+    def read_metadata(self, url):
+        '''
+        Returns dictionary with description of the saved response or None if url is not in the cache.
+        '''
+        try:
+            with open(self.get_path(url, '.json'), encoding='utf-8') as file:
+                metadata = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if metadata.get('url') != url or not os.path.exists(self.get_path(url, '.bin')):
+            return None
+        return metadata
+
+    def is_fresh(self, metadata):
+        '''
+        Checks if saved response can be used without downloading it again. Returns boolean.
+        '''
+        if metadata['last_day'] is not None:
+            last_day = datetime.strptime(metadata['last_day'], '%Y-%m-%d').date()
+            if last_day < date.today() - timedelta(days=self.immutable_days):
+                return True
+        return time.time() - metadata['fetched_at'] < self.recent_ttl
+
+    def contains(self, url):
+        '''
+        Checks if response for the url is saved (fresh or not). Returns boolean.
+        '''
+        return self.read_metadata(url) is not None
+
+    def get(self, url, fresh_only=True):
+        '''
+        Returns saved content (bytes) for the url. If url is not in the cache or fresh_only is True and saved response
+        has to be downloaded again, returns None.
+        '''
+        metadata = self.read_metadata(url)
+        if metadata is None or (fresh_only and not self.is_fresh(metadata)):
+            return None
+        path = self.get_path(url, '.bin')
+        try:
+            with open(path, 'rb') as file:
+                content = file.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return content
+
+    def get_conditional_headers(self, url):
+        '''
+        Returns dictionary with headers If-None-Match and If-Modified-Since created from validators of the saved response.
+        Returns empty dictionary if url is not in the cache or saved response has no validators.
+        '''
+        metadata = self.read_metadata(url)
+        if metadata is None:
+            return {}
+        headers = {}
+        if metadata.get('etag'):
+            headers['If-None-Match'] = metadata['etag']
+        if metadata.get('last_modified'):
+            headers['If-Modified-Since'] = metadata['last_modified']
+        return headers
+
+    def refresh(self, url, last_day=None):
+        '''
+        Marks saved response for the url as just downloaded, used when the server answered that it did not change (status 304).
+        Returns saved content (bytes) or None if url is not in the cache.
+        '''
+        metadata = self.read_metadata(url)
+        content = self.get(url, fresh_only=False)
+        if metadata is None or content is None:
+            return None
+        metadata['fetched_at'] = time.time()
+        if last_day is not None:
+            metadata['last_day'] = last_day.strftime('%Y-%m-%d')
+        with self.lock:
+            self.write_file(self.get_path(url, '.json'),
+                            json.dumps(metadata).encode('utf-8'))
+        return content
+
+    def put(self, url, content, last_day=None, etag=None, last_modified=None):
+        '''
+        Saves content (bytes) for the url. Last_day is the last day of data in the response (date).
+        Etag and last_modified are values of headers ETag and Last-Modified of the response.
+        '''
+        metadata = {'url': url, 'fetched_at': time.time(),
+                    'last_day': last_day.strftime('%Y-%m-%d') if last_day is not None else None,
+                    'etag': etag, 'last_modified': last_modified}
+        path = self.get_path(url, '.bin')
+        with self.lock:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            self.write_file(path, content)
+            self.write_file(self.get_path(url, '.json'),
+                            json.dumps(metadata).encode('utf-8'))
+            self.size += len(content) - old_size
+            if self.size > self.max_size:
+                self.evict()
+
+    def write_file(self, path, content):
+        '''
+        Writes content to a temporary file and moves it to path, so other readers never see partly written file.
+        '''
+        temporary_path = '{}.{}.tmp'.format(path, threading.get_ident())
+        with open(temporary_path, 'wb') as file:
+            file.write(content)
+        os.replace(temporary_path, path)
+
+    def evict(self):
+        '''
+        Removes least recently used responses until size of the cache is below max_size.
+        '''
+        files = sorted(self.get_files(), key=os.path.getmtime)
+        for path in files:
+            if self.size <= self.max_size:
+                break
+            self.size -= os.path.getsize(path)
+            os.remove(path)
+            json_path = path[:-len('.bin')] + '.json'
+            if os.path.exists(json_path):
+                os.remove(json_path)
+
+
+def get_default_cache_dir():
+    '''
+    Returns default folder of the cache: ~/.cache/fetch_data_tge_pse.
+    '''
+    return os.path.join(os.path.expanduser('~'), '.cache', 'fetch_data_tge_pse')
+
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class FetchHooks:
+    '''
+    Hooks called while data is downloaded and processed, used for instrumentation. Methods of this class do nothing,
+    subclasses (e.g. FetchStats) override them. Methods can be called from many threads at the same time.
+    On_request(url, seconds, size, attempt, error, content_size) is called after every request sent by Fetcher (also failed ones),
+    size is the number of bytes received from the server (before decompression, see get_response_size), content_size is 
+    the number of bytes of the content after decompression, attempt is 0 for the first attempt and error is None 
+    or the reason of the failure.
+    On_cache_hit(url) is called after every response read from the cache.
+    On_stage(name, seconds) is called after every stage measured with stage (e.g. parsing of one page).
+    '''
+
+    def on_request(self, url, seconds, size, attempt, error=None, content_size=0):
+        pass
+
+    def on_cache_hit(self, url):
+        pass
+
+    def on_stage(self, name, seconds):
+        pass
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        '''
+        Context manager which measures time of the code inside and calls on_stage(name, seconds).
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.on_stage(name, time.perf_counter() - start)
+
+
+class FetchStats(FetchHooks):
+    '''
+    FetchHooks which save every request and sum time of every stage. Times of stages run in many threads at the same time
+    are summed, so they can be higher than the time of the whole run. Summary is returned by summary (dictionary, 
+    can be saved as json) and format_summary (text).
+    '''
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+        self.requests = []
+        self.cache_hits = 0
+        self.stages = collections.defaultdict(lambda: {'calls': 0, 'seconds': 0.0})
+
+    def on_request(self, url, seconds, size, attempt, error=None, content_size=0):
+        with self.lock:
+            self.requests.append((url, seconds, size, attempt, error, content_size))
+
+    def on_cache_hit(self, url):
+        with self.lock:
+            self.cache_hits += 1
+
+    def on_stage(self, name, seconds):
+        with self.lock:
+            self.stages[name]['calls'] += 1
+            self.stages[name]['seconds'] += seconds
+
+    def summary(self):
+        '''
+        Returns dictionary with time of the whole run, number of requests, failed requests, retries and cache hits,
+        bytes received from the server (bytes) and bytes of their content after decompression (content_bytes), latency of requests (p50, p90, p99, max in seconds) and calls and time of every stage.
+        '''
+        with self.lock:
+            requests = list(self.requests)
+            stages = {name: dict(stage) for name, stage in self.stages.items()}
+            cache_hits = self.cache_hits
+        latencies = sorted(seconds for _, seconds, _, _, _, _ in requests)
+
+        def percentile(q):
+            if not latencies:
+                return 0
+            return latencies[min(len(latencies) - 1, int(round(q / 100 * (len(latencies) - 1))))]
+
+        return {'seconds': time.perf_counter() - self.start,
+                'requests': len(requests),
+                'failed_requests': sum(error is not None for _, _, _, _, error, _ in requests),
+                'retries': sum(attempt > 0 for _, _, _, attempt, _, _ in requests),
+                'cache_hits': cache_hits,
+                'bytes': sum(size for _, _, size, _, _, _ in requests),
+                'content_bytes': sum(content_size for _, _, _, _, _, content_size in requests),
+                'latency': {'p50': percentile(50), 'p90': percentile(90), 'p99': percentile(99),
+                            'max': latencies[-1] if latencies else 0},
+                'stages': stages}
+
+    def format_summary(self):
+        '''
+        Returns text with summary (see summary).
+        '''
+        summary = self.summary()
+        lines = ['Total time {:.2f} s'.format(summary['seconds']),
+                 'Requests {} ({} failed, {} retries, {} read from cache), {:.2f} MB downloaded ({:.2f} MB decompressed)'.format(
+                     summary['requests'], summary['failed_requests'], summary['retries'], summary['cache_hits'],
+                     summary['bytes'] / 1024 ** 2, summary['content_bytes'] / 1024 ** 2),
+                 'Latency p50 {p50:.3f} s, p90 {p90:.3f} s, p99 {p99:.3f} s, max {max:.3f} s'.format(**summary['latency'])]
+        for name, stage in sorted(summary['stages'].items(), key=lambda item: -item[1]['seconds']):
+            lines.append('{:<22} {:>6} calls {:>9.3f} s'.format(
+                name, stage['calls'], stage['seconds']))
+        return '\n'.join(lines)
+
+
+def get_response_size(response):
+    '''
+    Returns number of bytes of the body of the response received from the server. Compressed responses (e.g. gzip) are counted
+    before decompression, so the size can be lower than len(response.content). Number of bytes read by the connection 
+    (response.raw.tell()) is used, or header Content-Length if it is not known.
+    '''
+    raw = getattr(response, 'raw', None)
+    size = raw.tell() if hasattr(raw, 'tell') else 0
+    if not size and str(response.headers.get('Content-Length', '')).isdigit():
+        size = int(response.headers['Content-Length'])
+    return size or len(response.content)
+
+
+class Fetcher:
+    '''
+    Downloads content of urls. Session is shared between all requests (also between threads)
+    and every request waits for rate_limiter before it is sent. Timeout (seconds) is used for every request.
+    Failed requests are sent again up to retries times, waiting backoff * 2 ** attempt seconds between attempts.
+    If cache (ResponseCache) is given, saved responses are used instead of downloading them again. Responses which have 
+    to be downloaded again are requested with conditional headers, if the server answers with status 304 (not modified),
+    saved response is used.
+    If download_pool (ThreadPoolExecutor) is given, fetch_and_parse downloads urls in this pool instead of creating its own,
+    so many downloads can share one pool of threads.
+    Number of requests, retries, cache hits, bytes received from the server (bytes) and bytes of the content after decompression
+    (content_bytes) are counted in counters.
+    Hooks (FetchHooks) are called after every request and are used to measure stages of processing of the downloaded data.
+    '''
+
+    def __init__(self, session=None, rate_limiter=None, timeout=30, cache=None, retries=3, backoff=1, download_pool=None,
+                 hooks=None):
+        self.session = session if session is not None else create_session()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.timeout = timeout
+        self.cache = cache
+        self.retries = retries
+        self.backoff = backoff
+        self.download_pool = download_pool
+        self.hooks = hooks if hooks is not None else FetchHooks()
+        self.counters = collections.Counter()
+        self.counters_lock = threading.Lock()
+
+    def share(self, download_pool=None):
+        '''
+        Returns new Fetcher with the same session, rate limiter, cache and hooks, but with own counters,
+        used to count requests of one of many downloads run at the same time. Download_pool is the pool shared by the downloads.
+        '''
+        return Fetcher(self.session, self.rate_limiter, self.timeout, self.cache, self.retries, self.backoff,
+                       download_pool, self.hooks)
+
+    def count(self, **values):
+        '''
+        Adds values to counters, e.g. count(requests=1, bytes=100).
+        '''
+        with self.counters_lock:
+            self.counters.update(values)
+
+    def request(self, url, headers=None):
+        '''
+        Sends GET request to the url with additional headers (dictionary) and returns response. Connection errors, timeouts 
+        and responses with status from RETRY_STATUS_CODES are retried, other errors are raised at once. 
+        If the last attempt fails, raise error.
+        '''
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.wait(url)
+            if attempt > 0:
+                self.count(retries=1)
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, timeout=self.timeout, headers=headers)
+                error = response.status_code if response.status_code >= 400 else None
+                self.hooks.on_request(url, time.perf_counter() - start, get_response_size(response), attempt, error,
+                                      len(response.content))
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.retries:
+                    response.raise_for_status()
+                    return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+                self.hooks.on_request(url, time.perf_counter() - start, 0, attempt, type(error).__name__)
+                if attempt == self.retries:
+                    raise
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def get(self, url, last_day=None, fresh_only=True):
+        '''
+        Downloads url and returns content of the response as bytes. If something is wrong, raise error.
+        Last_day is the last day of data in the response (date), it is used to decide how long the response is kept in cache.
+        If fresh_only is False, saved response is used even if it should be downloaded again (see ResponseCache.get).
+        '''
+        return self.download(url, last_day, fresh_only)[0]
+
+    def download(self, url, last_day=None, fresh_only=True):
+        '''
+        The same as get, but returns tuple (content, downloaded), where downloaded is True if the content was downloaded 
+        from the server and False if it was read from the cache (also after the answer that it did not change).
+        '''
+        headers = None
+        if self.cache is not None:
+            content = self.cache.get(url, fresh_only)
+            if content is not None:
+                self.count(cache_hits=1)
+                self.hooks.on_cache_hit(url)
+                return content, False
+            headers = self.cache.get_conditional_headers(url)
+        response = self.request(url, headers)
+        self.count(requests=1, bytes=get_response_size(response), content_bytes=len(response.content))
+        if response.status_code == 304 and self.cache is not None:
+            content = self.cache.refresh(url, last_day)
+            if content is not None:
+                self.count(not_modified=1)
+                return content, False
+            # saved response was removed in the meantime, so it is downloaded without conditional headers
+            response = self.request(url)
+            self.count(requests=1, bytes=get_response_size(response), content_bytes=len(response.content))
+        if self.cache is not None:
+            self.cache.put(url, response.content, last_day,
+                           response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return response.content, True
+
+
+class BackfillJob:
+    '''
+    Manifest of a long download saved in json file path. Urls of finished requests (periods or days) are recorded 
+    in the manifest, so interrupted download can be continued: responses of finished requests are read from the cache 
+    of the fetcher (see fetch_and_parse) and only other requests are downloaded. Results are not saved in the manifest, 
+    so without the cache finished requests are downloaded again. Windows planned by WindowPlanner are recorded too
+    (list of tuples (start, end) with dates in windows), so continued download uses the same windows (see iter_pse_data).
+    If resume is False, manifest saved before is removed. File path is created when the first request is planned or finished.
+    '''
+
+    def __init__(self, path, resume=True):
+        self.path = path
+        self.lock = threading.Lock()
+        if not resume:
+            self.remove()
+        try:
+            with open(path, encoding='utf-8') as file:
+                manifest = json.load(file)
+            self.completed = set(manifest['completed'])
+            self.windows = [tuple(datetime.strptime(day, '%Y-%m-%d').date() for day in window)
+                            for window in manifest.get('windows', [])]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.completed = set()
+            self.windows = []
+
+    def is_done(self, url):
+        '''
+        Checks if request for the url is finished. Returns boolean.
+        '''
+        return url in self.completed
+
+    def complete(self, url):
+        '''
+        Records finished request for the url in the manifest.
+        '''
+        with self.lock:
+            self.completed.add(url)
+            self.write()
+
+    def plan(self, start, end):
+        '''
+        Records window planned between dates start and end (both included) in the manifest, if it is not recorded yet.
+        '''
+        with self.lock:
+            if (start, end) not in self.windows:
+                self.windows.append((start, end))
+                self.write()
+
+    def write(self):
+        '''
+        Writes the manifest to a temporary file and moves it to path. Should be used with the lock.
+        '''
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump({'completed': sorted(self.completed),
+                       'windows': [[day.strftime('%Y-%m-%d') for day in window] for window in self.windows]}, file)
+        os.replace(temporary_path, self.path)
+
+    def remove(self):
+        '''
+        Removes the manifest. Should be used when the whole download is saved.
+        '''
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def fetch_and_parse(urls, parse, fetcher=None, workers=1, parse_workers=1, last_days=None, job=None, on_download=None,
+                    max_pending=None):
+    '''
+    Generator which downloads urls with fetcher and parses every downloaded content with parse function.
+    Workers is the number of urls downloaded at the same time, parse_workers is the number of threads parsing
+    already downloaded content, so parsing does not block next downloads. At most max_pending (default 2 * workers) urls are 
+    downloaded or parsed at once, the rest waits until results are used. Every url is downloaded once.
+    Last_days is an optional list with the last day of data for every url (passed to fetcher.get).
+    If job (BackfillJob) is given, urls finished before are read from the cache of the fetcher (also if they are not fresh),
+    so results are the same as before the interruption, and finished urls are recorded in the job.
+    On_download is an optional function called in the downloading thread as on_download(url, content, seconds) after every download
+    from the server (not after responses read from the cache).
+    Urls and last_days can be generators, next urls are taken only when there is place for them in the pipeline.
+    If fetcher has download_pool, urls are downloaded in this pool and the pool is not shut down at the end.
+    Yields results of parse in the same order as urls.
+    '''
+    if fetcher is None:
+        fetcher = Fetcher()
+    if last_days is None:
+        last_days = itertools.repeat(None)
+    if max_pending is None:
+        max_pending = 2 * workers
+    shared_pool = fetcher.download_pool is not None
+    download_pool = fetcher.download_pool if shared_pool else ThreadPoolExecutor(
+        max_workers=workers)
+    parse_pool = ThreadPoolExecutor(max_workers=parse_workers)
+    pending = collections.deque()
+    try:
+        for url, last_day in zip(urls, last_days):
+            fresh_only = job is None or not job.is_done(url)
+            download = download_pool.submit(
+                download_content, fetcher, url, last_day, on_download, fresh_only)
+            pending.append(parse_pool.submit(
+                parse_download, download, parse, url, job))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        if not shared_pool:
+            download_pool.shutdown(cancel_futures=True)
+        parse_pool.shutdown(cancel_futures=True)
+
+
+def download_content(fetcher, url, last_day=None, on_download=None, fresh_only=True):
+    '''
+    Downloads url with fetcher and returns content (see Fetcher.get). If on_download is given and the content was downloaded
+    from the server, on_download(url, content, seconds) is called.
+    '''
+    start = time.perf_counter()
+    content, downloaded = fetcher.download(url, last_day, fresh_only)
+    if on_download is not None and downloaded:
+        on_download(url, content, time.perf_counter() - start)
+    return content
+
+
+def parse_download(download, parse, url=None, job=None):
+    '''
+    Waits for the download (future with content) and returns parsed content. If job is given, url is recorded as finished.
+    '''
+    result = parse(download.result())
+    if job is not None:
+        job.complete(url)
+    return result
+
+
+WINDOW_PLANS = {
+    1: {'initial_days': 31, 'min_days': 1, 'max_days': 366, 'target_bytes': 2 * 1024 ** 2, 'target_seconds': 10},
+    2: {'initial_days': 31, 'min_days': 1, 'max_days': 31, 'target_bytes': 2 * 1024 ** 2, 'target_seconds': 10},
+}
+
+
+# sizes of windows of the calendar grid: (count, unit, maximum number of days in one window), see get_grid_window
+GRID_WINDOWS = ((12, 'months', 366), (6, 'months', 184), (4, 'months', 123), (3, 'months', 92), (2, 'months', 62),
+                (1, 'months', 31), (16, 'days', 16), (8, 'days', 8), (4, 'days', 7), (2, 'days', 5))
+
+
+def get_grid_window(day, size):
+    '''
+    Returns tuple (start, end) with dates of the window of the calendar grid with size (one of GRID_WINDOWS) which contains 
+    day (date). Windows of count months start every count months from the 1st of January. Windows of count days start 
+    every count days from the 1st day of the month and the last window of the month ends at the end of the month, 
+    so every window has at least 2 days (www.pse.pl needs date_from below date_to).
+    '''
+    count, unit, _ = size
+    if unit == 'months':
+        month = (day.month - 1) // count * count
+        end_month = month + count
+        return (date(day.year, month + 1, 1),
+                date(day.year + end_month // 12, end_month % 12 + 1, 1) - timedelta(days=1))
+    last_window = 27 // count
+    window = min((day.day - 1) // count, last_window)
+    start = day.replace(day=window * count + 1)
+    if window == last_window:
+        next_month = day.replace(day=28) + timedelta(days=4)
+        return start, next_month - timedelta(days=next_month.day)
+    return start, start + timedelta(days=count - 1)
+
+
+class WindowPlanner:
+    '''
+    Plans periods (windows) of data downloaded from www.pse.pl. Windows are taken from the calendar grid (see get_grid_window),
+    so the same days are always downloaded with the same urls and responses saved in the cache are used also by downloads
+    of other (e.g. overlapping) ranges of dates. The first window has about initial_days days, next windows are sized 
+    by observed size and download time of previous responses, so one response has about target_bytes bytes and is downloaded
+    in about target_seconds seconds. Window is never shorter than min_days and longer than max_days (limit of the endpoint),
+    planned size changes at most 2 times between windows and the largest window of the grid not longer than it is used.
+    Default settings for every source are in WINDOW_PLANS.
+    '''
+
+    def __init__(self, initial_days=31, min_days=1, max_days=31, target_bytes=2 * 1024 ** 2, target_seconds=10):
+        self.min_days = min_days
+        self.max_days = max_days
+        self.target_bytes = target_bytes
+        self.target_seconds = target_seconds
+        self.days = max(min_days, min(initial_days, max_days))
+        sizes = [size for size in GRID_WINDOWS if size[2] <= max_days]
+        self.sizes = [size for size in sizes if size[2] >= min_days] or sizes[:1] or [GRID_WINDOWS[-1]]
+        self.lock = threading.Lock()
+        self.observations = []
+
+    def create_windows(self, date_from, date_to, is_cached=None, planned=()):
+        '''
+        Generator which yields tuples (start, end) with dates of windows which cover all days between date_from and date_to
+        (both included). The first window contains date_from, next windows start just after the previous window.
+        Planned is a list of tuples (start, end) with dates of windows planned before (e.g. by interrupted download, 
+        see BackfillJob), they are yielded first as long as they continue the windows, next windows are planned.
+        Windows do not end after today (or date_to if it is later), but the first and the last window can have days 
+        before date_from or after date_to, they have to be removed from the data (see select_days).
+        If is_cached(start, end) is given and returns True for a window of the grid with the next day, the largest such 
+        window is used. Otherwise size of the window is taken when it is yielded, so it depends on responses observed until then.
+        From windows not longer than the planned size the smallest one which ends on date_to or later is used. If no window
+        reaches date_to, the smallest one which ends with the largest window is used (the first window has fewer days before
+        date_from with the same number of requests).
+        '''
+        day = pd.Timestamp(date_from).date()
+        date_to = pd.Timestamp(date_to).date()
+        limit = max(date_to, date.today())
+
+        def get_window(size):
+            start, end = get_grid_window(day, size)
+            end = min(end, limit)
+            return min(start, end - timedelta(days=1)), end
+
+        first = True
+        for window in planned:
+            if day > date_to or not window[0] <= day <= window[1]:
+                break
+            yield pd.Timestamp(window[0]), pd.Timestamp(window[1])
+            day = window[1] + timedelta(days=1)
+            first = False
+        while day <= date_to:
+            window = None
+            if is_cached is not None:
+                window = next((window for window in map(get_window, self.sizes) if is_cached(*window)), None)
+            if window is None:
+                with self.lock:
+                    days = self.days
+                windows = [get_window(size) for size in self.sizes if size[2] <= days] or [get_window(self.sizes[-1])]
+                windows = [window for window in windows if first or window[0] == day] or windows[-1:]
+                covering = [window for window in windows if window[1] >= date_to]
+                if not covering:
+                    covering = [window for window in windows if window[1] == windows[0][1]]
+                window = covering[-1]
+            yield pd.Timestamp(window[0]), pd.Timestamp(window[1])
+            day = window[1] + timedelta(days=1)
+            first = False
+
+    def observe(self, days, size, seconds):
+        '''
+        Records response for the window with days days, size bytes and download time in seconds, then sets size of next windows.
+        '''
+        with self.lock:
+            self.observations.append((days, size, seconds))
+            proposals = [self.max_days]
+            if size > 0:
+                proposals.append(self.target_bytes * days / size)
+            if seconds > 0:
+                proposals.append(self.target_seconds * days / seconds)
+            days_proposed = min(proposals)
+            days_proposed = max(self.days / 2, min(days_proposed, self.days * 2))
+            self.days = int(max(self.min_days, min(days_proposed, self.max_days)))
+
+    def summary(self):
+        '''
+        Returns dictionary with number of requests, downloaded days, bytes, download time and sizes of windows.
+        '''
+        with self.lock:
+            return {'requests': len(self.observations),
+                    'days': sum(days for days, _, _ in self.observations),
+                    'bytes': sum(size for _, size, _ in self.observations),
+                    'seconds': round(sum(seconds for _, _, seconds in self.observations), 3),
+                    'window_days': [days for days, _, _ in self.observations]}
+
+
+def create_pse_windows(periods_list):
+    '''
+    Returns list of tuples (start, end) with dates of the periods from periods_list.
+    First period is between list[0] and list[1], second period is between list[1] + 1 day and list[2].
+    '''
+    windows = []
     for i in range(len(periods_list)-1):
         if i == 0:
-            url_list = url_base.format(periods_list[i].strftime(
-                '%Y%m%d'), periods_list[i+1].strftime('%Y%m%d'))
-            df = pd.read_csv(url_list, sep=';', encoding='cp1250')
+            windows.append((periods_list[i], periods_list[i+1]))
         else:
-            url_list = url_base.format(
-                (periods_list[i]+timedelta(days=1)).strftime('%Y%m%d'), periods_list[i+1].strftime('%Y%m%d'))
-            df = pd.concat(
-                [df, pd.read_csv(url_list, sep=';', encoding='cp1250')], ignore_index=True)
-    return df
+            windows.append(
+                (periods_list[i]+timedelta(days=1), periods_list[i+1]))
+    return windows
+
+
+def create_pse_urls(url_base, windows):
+    '''
+    Returns list of urls created by filling url_base with dates from windows in format YYYYMMDD.
+    '''
+    return [url_base.format(start.strftime('%Y%m%d'), end.strftime('%Y%m%d')) for start, end in windows]
+
+
+def select_days(dataframe, first_day, last_day, date_column='Data'):
+    '''
+    Returns dataframe with rows with dates in date_column between first_day and last_day (dates, both included).
+    '''
+    days = parse_dates(dataframe[date_column])
+    selected = (days >= pd.Timestamp(first_day)) & (days <= pd.Timestamp(last_day))
+    return dataframe[selected.to_numpy()].reset_index(drop=True)
+
+
+def read_pse_csv(content):
+    '''
+    Reads csv file downloaded from www.pse.pl (bytes) and returns dataframe.
+    '''
+    return pd.read_csv(BytesIO(content), sep=';', encoding='cp1250')
+
+
+def iter_pse_data(url_base, periods_list, workers=1, fetcher=None, job=None, planner=None):
+    '''
+    Generator which downloads data from website (www.pse.pl). Url_base is filled with dates from periods_list 
+    and data for every period is downloaded. Yields dataframe for every period in the same order as periods_list.
+    Workers is the number of periods downloaded at the same time. Fetcher is used to download the data, by default new Fetcher is created.
+    Job (BackfillJob) is used to save finished periods, see fetch_and_parse.
+    If planner (WindowPlanner) is given, periods between the first and the last date of periods_list are planned by the planner
+    (windows saved in the cache of the fetcher are used first) and days outside of this range are removed from the data.
+    Windows planned by the planner are recorded in the job and the same windows are used when the job is continued.
+    The planner observes only responses downloaded from the server, not read from the cache.
+    '''
+    if fetcher is None:
+        fetcher = Fetcher()
+    first_day = pd.Timestamp(periods_list[0]).date()
+    last_day = pd.Timestamp(periods_list[-1]).date()
+    if planner is None:
+        windows = create_pse_windows(periods_list)
+    else:
+        is_cached = None
+        if fetcher.cache is not None:
+            def is_cached(start, end):
+                return fetcher.cache.contains(url_base.format(start.strftime('%Y%m%d'), end.strftime('%Y%m%d')))
+        windows = planner.create_windows(first_day, last_day, is_cached, job.windows if job is not None else ())
+    window_days = {}
+    # days of every window selected from the data, in the same order as windows
+    selected_days = collections.deque()
+
+    def create_requests():
+        next_day = first_day
+        for start, end in windows:
+            url = url_base.format(start.strftime(
+                '%Y%m%d'), end.strftime('%Y%m%d'))
+            window_days[url] = (end.normalize() - start.normalize()).days + 1
+            selected_days.append((start.date() < next_day or end.date() > last_day,
+                                  next_day, min(end.date(), last_day)))
+            if planner is not None and job is not None:
+                job.plan(start.date(), end.date())
+            next_day = end.date() + timedelta(days=1)
+            yield url, end.date()
+
+    def on_download(url, content, seconds):
+        planner.observe(window_days[url], len(content), seconds)
+
+    def parse(content):
+        with fetcher.hooks.stage('read_pse_csv'):
+            return read_pse_csv(content)
+
+    requests_for_urls, requests_for_last_days = itertools.tee(
+        create_requests())
+    urls = (url for url, _ in requests_for_urls)
+    last_days = (last_day for _, last_day in requests_for_last_days)
+    for dataframe in fetch_and_parse(urls, parse, fetcher, workers, last_days=last_days, job=job,
+                                     on_download=on_download if planner is not None else None):
+        outside, first, last = selected_days.popleft()
+        yield select_days(dataframe, first, last) if outside else dataframe
+
+
+def get_pse_data(url_base, periods_list, workers=1, fetcher=None, job=None):
+    '''
+    Download data from website (www.pse.pl). Url_base is filled with dates from periods_list, 
+    then data is downloaded and concatenated into one dataframe. Returns dataframe.
+    Workers is the number of periods downloaded at the same time. Order of the data is always the same as order of periods_list.
+    Fetcher is used to download the data, by default new Fetcher is created.
+    Job (BackfillJob) is used to save finished periods, see fetch_and_parse.
+    '''
+    if fetcher is None:
+        fetcher = Fetcher()
+    data = list(iter_pse_data(url_base, periods_list, workers, fetcher, job))
+    with fetcher.hooks.stage('concat'):
+        return pd.concat(data, ignore_index=True)
 
 
 def get_find_variables(find='table', find_id='footable_kontrakty_godzinowe'):
@@ -101,32 +935,51 @@ def get_find_variables(find='table', find_id='footable_kontrakty_godzinowe'):
     return find_variables
 
 
-def check_tge_date_conditions(date_from, date_to):
+def check_tge_date_conditions(date_from, date_to, cached_dates=()):
     '''
     Check if date_from is above todays date minus 3 months and if date_from is below or equal date_to. 
     Dates should be in format YYYY-MM-DD. Returns boolean.
+    Days older than 3 months are accepted only if all of them are in cached_dates (dates in format DD-MM-YYYY),
+    because the website shows only data for the last 3 months.
     '''
-    min_date = date.today() - relativedelta(months=3)
+    min_date = date.today() - dateutil_relativedelta.relativedelta(months=3)
     min_date_condition = min_date < datetime.strptime(
         date_from, '%Y-%m-%d').date()
     date_order_condition = datetime.strptime(
         date_from, '%Y-%m-%d') <= datetime.strptime(date_to, '%Y-%m-%d')
+    if not min_date_condition and date_order_condition and cached_dates:
+        old_dates = create_data_periods(
+            date_from, min(min_date.strftime('%Y-%m-%d'), date_to))
+        min_date_condition = all(day in cached_dates for day in old_dates)
     return min_date_condition and date_order_condition
 
 
-def get_data_tge(dates, url_base, find, find_id):
+def parse_tge_table(content, find, find_id):
+    '''
+    Parses html page (bytes) and returns soup.find(find, id=find_id).
+    '''
+    soup = bs4.BeautifulSoup(content, 'lxml')
+    return soup.find(find, id=find_id)
+
+
+def get_data_tge(dates, url_base, find, find_id, fetcher=None, workers=1):
     '''
-    Generator which scrape data from website. In a loop url_base is filled with dates, then data is downloaded from filled url_base.
+    Generator which scrape data from website. Url_base is filled with dates, then data is downloaded from filled url_base.
     Find and find_id are used to select properly object in the website. Yields soup.find(find, id=find_id).
+    Workers is the number of pages downloaded at the same time, pages are parsed in a separate thread while next pages are downloaded.
+    Every page is downloaded once and results are yielded in the same order as dates.
 
     If data is scraped from https://tge.pl/energia-elektryczna-rdn dates has to contain only dates from last 3 months.
     '''
-    for date in dates:
-        url_tge = url_base.format(date)
-        page = requests.get(url_tge)
-        soup = BeautifulSoup(page.text, 'lxml')
-        soup_find = soup.find(find, id=find_id)
-        yield soup_find
+    if fetcher is None:
+        fetcher = Fetcher()
+    urls = [url_base.format(date) for date in dates]
+    last_days = [datetime.strptime(date, '%d-%m-%Y').date() for date in dates]
+
+    def parse(content):
+        with fetcher.hooks.stage('parse_tge_table'):
+            return parse_tge_table(content, find, find_id)
+    yield from fetch_and_parse(urls, parse, fetcher, workers, last_days=last_days)
 
 
 def get_header(table, *args, **kwargs):
@@ -169,18 +1022,119 @@ def fill_tge_dataframe(header, dates, gen_tge_data, statistics=False, table_find
     Dates has to be list with the same values as used in gen_tge_data.
     If statistics is True, whole table is scraped (with statistics in the end of table), default statistics is False.
     Table_find_all, row_find_all, row_min, row_max are arguments used to extract data from html code.
+    Rows are collected in a list and dataframe is created once at the end. All columns are text columns with values 
+    as shown on the website, so csv files are not changed; typed columns are created by convert_types.
     Returns dataframe.
     '''
-    df = pd.DataFrame(columns=header)
+    rows = []
     if statistics:
         row_max = None
     for date, table in zip(dates, gen_tge_data):
         for j in table.find_all(table_find_all)[row_min:row_max]:
             row_data = j.find_all(row_find_all)
             row = [i.text.strip() for i in row_data]
+            if len(row) != len(header) - 1:
+                raise ValueError(
+                    "Row of the table for {} does not match the header.".format(date))
             row.insert(0, date)
-            length = len(df)
-            df.loc[length] = row
+            rows.append(row)
+    return pd.DataFrame(rows, columns=header, dtype=str)
+
+
+def extract_rdn_table(content, find_id='footable_kontrakty_godzinowe', statistics=False, row_min=2, row_max=26):
+    '''
+    Fast extraction of the table with id find_id from html page (bytes). Lxml XPath is used directly, without BeautifulSoup.
+    Header is the same as create_one_header(get_header(table, 'th', colspan="2"), get_header(table, 'th', align="")) 
+    and rows are selected in the same way as in fill_tge_dataframe (statistics, row_min, row_max). 
+    Returns tuple (header, columns), where columns is a list with values of every column from header except 'Data'.
+    '''
+    tables = lxml_html.fromstring(content).xpath(
+        '//table[@id=$find_id]', find_id=find_id)
+    if not tables:
+        raise ValueError("Table {} not found in the page.".format(find_id))
+    table = tables[0]
+    headers_top = [th.text_content()
+                   for th in table.xpath('.//th[@colspan="2"]')]
+    headers_bottom = [th.text_content()
+                      for th in table.xpath('.//th[@align=""]')]
+    header = create_one_header(headers_top, headers_bottom)
+    if statistics:
+        row_max = None
+    rows = [[td.text_content().strip() for td in tr.iter('td')]
+            for tr in table.xpath('.//tr')[row_min:row_max]]
+    if any(len(row) != len(header) - 1 for row in rows):
+        raise ValueError("Row of the table does not match the header.")
+    if rows:
+        columns = [list(column) for column in zip(*rows)]
+    else:
+        columns = [[] for _ in header[1:]]
+    return header, columns
+
+
+def get_rdn_data(dates, url_base, find_id='footable_kontrakty_godzinowe', statistics=False, fetcher=None, workers=1, job=None,
+                 parse_processes=0):
+    '''
+    Generator which downloads pages for every date (like get_data_tge) and extracts table find_id with extract_rdn_table.
+    Job (BackfillJob) is used to save finished days, see fetch_and_parse.
+    If parse_processes is higher than 0, pages are parsed in the pool of parse_processes processes (see create_parse_pool), 
+    so parsing of many pages is not limited to one core. Processes get content of pages and return (header, columns),
+    results are the same as without processes.
+    Yields tuples (header, columns) in the same order as dates.
+    '''
+    if fetcher is None:
+        fetcher = Fetcher()
+    urls = [url_base.format(date) for date in dates]
+    last_days = [datetime.strptime(date, '%d-%m-%Y').date() for date in dates]
+    extract = functools.partial(extract_rdn_table, find_id=find_id, statistics=statistics)
+    if parse_processes <= 0:
+        def parse(content):
+            with fetcher.hooks.stage('extract_rdn_table'):
+                return extract(content)
+        yield from fetch_and_parse(urls, parse, fetcher, workers, last_days=last_days, job=job)
+        return
+
+    with create_parse_pool(parse_processes) as process_pool:
+        def parse_in_process(content):
+            with fetcher.hooks.stage('extract_rdn_table'):
+                return process_pool.submit(extract, content).result()
+        yield from fetch_and_parse(urls, parse_in_process, fetcher, workers, parse_processes, last_days=last_days,
+                                   job=job, max_pending=2 * max(workers, parse_processes))
+
+
+def create_parse_pool(processes):
+    '''
+    Creates ProcessPoolExecutor with processes used to parse pages. Processes are started with spawn, not fork, 
+    because the pool is used by threads of fetch_and_parse and forking of a process with running threads is not safe.
+    '''
+    # imported here, because they slow down start of every command which does not parse in processes
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+
+
+def create_rdn_dataframe(dates, tables):
+    '''
+    Creates dataframe from tables yielded by get_rdn_data. Dates has to be list with the same values as used in get_rdn_data,
+    they are used to fill column 'Data'. Header is taken from the first table. 
+    Returns the same dataframe as fill_tge_dataframe.
+    '''
+    header = None
+    data_column = []
+    columns = []
+    for date, (table_header, table_columns) in zip(dates, tables):
+        if header is None:
+            header = table_header
+            columns = [[] for _ in table_columns]
+        elif len(table_columns) != len(columns):
+            raise ValueError(
+                "Table for {} does not match the header.".format(date))
+        data_column.extend([date] * len(table_columns[0]))
+        for column, values in zip(columns, table_columns):
+            column.extend(values)
+    if header is None:
+        return pd.DataFrame()
+    df = pd.DataFrame(dict(enumerate([data_column] + columns)), dtype=str)
+    df.columns = header
     return df
 
 
@@ -196,15 +1150,830 @@ def save_to_csv(dataframe, name, folder_path=None):
         dataframe.to_csv(name, index=False, encoding='utf-8')
 
 
+# columns with labels (hours of www.pse.pl and tge.pl, codes of units), they are always text columns
+TEXT_COLUMNS = ('Godz.', 'Czas', 'Kod')
+
+
+def convert_types(dataframe, date_column='Data', text_columns=TEXT_COLUMNS):
+    '''
+    Returns copy of dataframe with typed columns. Types do not depend on values in the part of the data, so all parts
+    (e.g. chunks of save_data_chunks) have the same types. Text_columns are text columns. Columns with numbers (also 
+    in polish format: comma as decimal separator, spaces between thousands, empty value or '-' if there is no value) 
+    and columns without any values are float columns. Date_column is converted to datetime column (see parse_dates). 
+    Other columns (with text) are not changed.
+    '''
+    dataframe = dataframe.copy()
+    for column in dataframe.columns:
+        if column == date_column:
+            dataframe[column] = parse_dates(dataframe[column]).to_numpy()
+        elif column in text_columns:
+            values = dataframe[column]
+            dataframe[column] = values.astype(str).where(values.notna(), None)
+        elif pd.api.types.is_numeric_dtype(dataframe[column]):
+            dataframe[column] = dataframe[column].astype(float)
+        else:
+            values = dataframe[column].astype(str).str.replace(
+                r'\s', '', regex=True).str.replace(',', '.', regex=False)
+            missing = values.isin(['', '-', 'nan', 'None']) | dataframe[column].isna()
+            # columns with text (e.g. codes of units) are found on the first values, without converting the whole column
+            sample = values[~missing].head(100)
+            if pd.to_numeric(sample, errors='coerce').isna().any():
+                continue
+            numbers = pd.to_numeric(values.mask(missing), errors='coerce')
+            if (numbers.notna() | missing).all():
+                dataframe[column] = numbers.astype(float)
+    return dataframe
+
+
+HOUR_COLUMNS = ('Godz.', 'Czas')
+
+
+def parse_hours(values):
+    '''
+    Parses labels of hours used by www.pse.pl (hour ending: 1 to 24, 2A for the repeated hour of the day with 25 hours)
+    and tge.pl (hour range: 0-1 to 23-24, a letter after the range for the repeated hour). Returns tuple of two series:
+    number of the hour ending (1 to 24) and order of the label in the day (labels with letters after labels without them).
+    Labels which are not hours (e.g. Min, Max, Suma) have missing values.
+    '''
+    parts = pd.Series(values).astype(str).str.strip().str.extract(
+        r'^(\d{1,2})(?:\s*-\s*(\d{1,2}))?\s*([A-Za-z]?)$')
+    hour_end = pd.to_numeric(parts[1].fillna(parts[0]), errors='coerce')
+    suffix = parts[2].str.lower().map({'': 0, 'a': 1, 'b': 2, 'c': 3})
+    return hour_end, hour_end * 10 + suffix
+
+
+def normalize_data(dataframe, date_column='Data', hour_column=None, timezone='UTC'):
+    '''
+    Returns dataframe with typed columns (see convert_types) and index 'timestamp' with the start of every hour (tz-aware,
+    in timezone, default UTC, e.g. Europe/Warsaw). Date_column and hour_column (default the first column from HOUR_COLUMNS
+    in the dataframe) are used to create the index and are removed. Hours are in polish time (Europe/Warsaw):
+    on days with 24 hours hour ending h starts h - 1 hours after midnight, on days with 23 or 25 hours (change of time)
+    hours follow one another in the order of their labels (see parse_hours), e.g. 1, 2, 2A, 3, ..., 24.
+    Rows without hour (e.g. Min, Max, Suma statistics of tge.pl) are removed. Order of rows is not changed.
+    '''
+    if hour_column is None:
+        hour_column = next(column for column in HOUR_COLUMNS if column in dataframe.columns)
+    # every day has the same labels of hours, so only unique labels are parsed
+    hour_codes, hours = pd.factorize(dataframe[hour_column], use_na_sentinel=False)
+    hour_end, hour_order = parse_hours(hours)
+    hour_end, hour_order = hour_end.to_numpy()[hour_codes], hour_order.to_numpy()[hour_codes]
+    hourly = ~pd.isna(hour_end)
+    dataframe = dataframe[hourly]
+    hour_end, hour_order = hour_end[hourly], pd.Series(hour_order[hourly])
+
+    day_codes, days = pd.factorize(dataframe[date_column])
+    midnights = pd.DatetimeIndex(parse_dates(days)).tz_localize('Europe/Warsaw').tz_convert('UTC')
+    next_midnights = (pd.DatetimeIndex(parse_dates(days)) + pd.Timedelta(days=1)).tz_localize(
+        'Europe/Warsaw').tz_convert('UTC')
+    day_hours = ((next_midnights - midnights) / pd.Timedelta(hours=1)).to_numpy()[day_codes]
+    day_order = hour_order.groupby(day_codes).rank(method='dense').to_numpy()
+    offsets = pd.to_timedelta(
+        pd.Series(hour_end - 1).where(day_hours == 24, day_order - 1).to_numpy(), unit='h')
+    timestamps = midnights[day_codes] + offsets
+
+    normalized = convert_types(dataframe.drop(columns=[date_column, hour_column]), date_column=None)
+    normalized.index = pd.DatetimeIndex(timestamps, name='timestamp').tz_convert(timezone)
+    return normalized
+
+
+def get_file_extension(file_format):
+    '''
+    Returns extension of the file for file_format (csv, parquet or feather).
+    '''
+    extensions = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+    if file_format not in extensions:
+        raise Exception("Wrong file format. Choose csv, parquet or feather.")
+    return extensions[file_format]
+
+
+def save_data(dataframe, name, folder_path=None, file_format='csv', partition=False, source=None, date_column='Data'):
+    '''
+    Saves dataframe to the file in file_format: csv (the same as save_to_csv), parquet or feather.
+    Name is the name of the file without extension. Parquet and feather files have typed columns (see convert_types),
+    they need pyarrow package.
+    If partition is True, dataframe is saved as a dataset partitioned by source and month:
+    folder_path/dataset/source=<source>/month=<YYYY-MM>/<name>.<extension>, where month is taken from date_column.
+    Returns list with paths of saved files.
+    '''
+    extension = get_file_extension(file_format)
+    folder_path = folder_path or ''
+    if file_format != 'csv':
+        dataframe = convert_types(dataframe, date_column)
+    if partition:
+        months = parse_dates(dataframe[date_column]).dt.strftime('%Y-%m')
+        parts = [(os.path.join(folder_path, 'dataset', 'source=' + str(source), 'month=' + month),
+                  dataframe[(months == month).to_numpy()].reset_index(drop=True)) for month in months.unique()]
+    else:
+        parts = [(folder_path, dataframe)]
+    paths = []
+    for part_folder, part in parts:
+        if part_folder:
+            os.makedirs(part_folder, exist_ok=True)
+        path = os.path.join(part_folder, name + extension)
+        if file_format == 'csv':
+            save_to_csv(part, path)
+        elif file_format == 'parquet':
+            part.to_parquet(path, index=False)
+        else:
+            part.reset_index(drop=True).to_feather(path)
+        paths.append(path)
+    return paths
+
+
+def save_data_chunks(chunks, name, folder_path=None, file_format='csv', partition=False, source=None, date_column='Data'):
+    '''
+    Saves dataframes from chunks (iterable, e.g. iter_source_data) one by one, so only one chunk is kept in memory.
+    All chunks are saved in one file name.<extension> in file_format (see save_data). Parquet and feather files are written
+    with pyarrow writers, schema of the file is taken from the first chunk (types of columns are the same in every chunk,
+    see convert_types).
+    If partition is True, every chunk is saved with save_data as separate files name_<number of chunk> in the partitioned dataset.
+    The first chunk is taken before any file is created, so errors raised by chunks at the start do not leave empty files.
+    Returns list with paths of saved files.
+    '''
+    extension = get_file_extension(file_format)
+    folder_path = folder_path or ''
+    chunks = iter(chunks)
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
+        return []
+    chunks = itertools.chain([first_chunk], chunks)
+    if partition:
+        paths = []
+        for i, chunk in enumerate(chunks):
+            paths.extend(save_data(chunk, '{}_{:05d}'.format(name, i), folder_path,
+                                   file_format, partition, source, date_column))
+        return paths
+    path = os.path.join(folder_path, name + extension)
+    if file_format == 'csv':
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(file, header=(i == 0), index=False)
+        return [path]
+
+    import pyarrow as pa
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+
+        def create_writer(schema):
+            return pq.ParquetWriter(path, schema)
+    else:
+        import pyarrow.ipc as ipc
+
+        def create_writer(schema):
+            return ipc.new_file(path, schema)
+    writer = None
+    schema = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(convert_types(
+                chunk, date_column), schema=schema, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = create_writer(schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return [path]
+
+
+def get_source_name(number, statistics=False):
+    '''
+    Returns name of the data from the source selected by number (see get_url_base_link), used in names of files.
+    '''
+    if number == 1:
+        return 'PL_WYK_KSE'
+    elif number == 2:
+        return 'PL_GEN_MOC_JW_EPS'
+    elif number == 3:
+        return 'EE_RDN_statistics' if statistics else 'EE_RDN'
+    raise Exception("Choose number from 1 to 3.")
+
+
+def iter_source_data(number, date_from, date_to, statistics=False, fetcher=None, workers=1, job=None, planner=None,
+                     parse_processes=0):
+    '''
+    Generator which downloads data from the source selected by number (see get_url_base_link) between date_from and date_to
+    (format YYYY-MM-DD). Yields dataframe for every period (sources 1 and 2) or every day (source 3), so the whole data
+    is never kept in memory. Statistics is used only for source 3 (see fill_tge_dataframe).
+    Job (BackfillJob) is used to save finished periods or days, see fetch_and_parse.
+    For sources 1 and 2 periods are planned by planner (WindowPlanner, default is create_planner(number)).
+    Raises error if dates are wrong for the selected source.
+    '''
+    url = get_url_base_link(number)
+    if fetcher is None:
+        fetcher = Fetcher()
+    if number in (1, 2):
+        if not check_dates(date_from, date_to):
+            raise Exception("Wrong dates. Date_from should be below date_to.")
+        if planner is None:
+            planner = create_planner(number)
+        periods = create_data_periods(date_from, date_to, 31)
+        yield from iter_pse_data(url, periods, workers, fetcher, job, planner)
+        return
+    cached_dates = ()
+    if fetcher.cache is not None:
+        cached_dates = {day for day in create_data_periods(date_from, date_to)
+                        if fetcher.cache.contains(url.format(day))}
+    if not check_tge_date_conditions(date_from, date_to, cached_dates):
+        raise Exception(
+            "Check the dates. Date_from should be below or equal to date_to and only data for past 3 months is available.")
+    periods = create_data_periods(date_from, date_to, 1)
+    find_variables = get_find_variables()
+    tables = get_rdn_data(periods, url, find_variables[1],
+                          statistics, fetcher, workers, job, parse_processes)
+    for day, table in zip(periods, tables):
+        with fetcher.hooks.stage('create_rdn_dataframe'):
+            dataframe = create_rdn_dataframe([day], [table])
+        yield dataframe
+
+
+def get_source_data(number, date_from, date_to, statistics=False, fetcher=None, workers=1, job=None, planner=None,
+                    parse_processes=0):
+    '''
+    Downloads data from the source selected by number (see get_url_base_link) between date_from and date_to
+    (format YYYY-MM-DD) and returns dataframe. Statistics is used only for source 3 (see fill_tge_dataframe).
+    Job (BackfillJob) is used to save finished periods or days, see fetch_and_parse.
+    For sources 1 and 2 periods are planned by planner (WindowPlanner), see iter_source_data.
+    Raises error if dates are wrong for the selected source.
+    '''
+    if fetcher is None:
+        fetcher = Fetcher()
+    data = list(iter_source_data(number, date_from, date_to, statistics, fetcher, workers, job, planner, parse_processes))
+    with fetcher.hooks.stage('concat'):
+        return pd.concat(data, ignore_index=True)
+
+
+def parse_dates(values):
+    '''
+    Converts values with dates in format YYYYMMDD, YYYY-MM-DD or DD-MM-YYYY (formats used by www.pse.pl and tge.pl)
+    to datetimes. All values have to be in the same format. Returns series.
+    '''
+    values = pd.Series(values).astype(str).str.strip()
+    for date_format in ['%Y%m%d', '%Y-%m-%d', '%d-%m-%Y']:
+        dates = pd.to_datetime(values, format=date_format, errors='coerce')
+        if dates.notna().all():
+            return dates
+    raise ValueError("Unknown format of dates.")
+
+
+def get_last_date(dataframe, date_column='Data'):
+    '''
+    Returns the last date (datetime.date) from date_column of dataframe or None if dataframe is empty.
+    '''
+    if dataframe.empty:
+        return None
+    return parse_dates(dataframe[date_column]).max().date()
+
+
+def sync_file(number, file_path, date_to, date_from='', statistics=False, fetcher=None, workers=1):
+    '''
+    Updates csv file file_path with data from the source selected by number. The last date saved in the file is found,
+    then data from this date (it can be incomplete) to date_to is downloaded and replaces rows of these days in the file.
+    For sources 1 and 2 at least two days are downloaded, because www.pse.pl needs date_from below date_to.
+    If file does not exist, data from date_from to date_to is downloaded. Dates should be in format YYYY-MM-DD.
+    If the file already has data after date_to, nothing is downloaded and the file is not changed.
+    Running it again with the same date_to gives the same file. Returns number of downloaded rows.
+    '''
+    if fetcher is None:
+        fetcher = Fetcher()
+    existing = None
+    if os.path.exists(file_path):
+        existing = pd.read_csv(file_path, dtype=str,
+                               keep_default_na=False, encoding='utf-8')
+    last_date = get_last_date(existing) if existing is not None else None
+    if last_date is None:
+        if not date_from:
+            raise Exception(
+                "File is empty or does not exist. Paste date_from to download the first data.")
+        start = datetime.strptime(date_from, '%Y-%m-%d').date()
+    else:
+        start = last_date
+    end = datetime.strptime(date_to, '%Y-%m-%d').date()
+    if start > end:
+        return 0
+    if number in (1, 2):
+        start = min(start, end - timedelta(days=1))
+    data = get_source_data(number, start.strftime('%Y-%m-%d'), date_to,
+                           statistics, fetcher, workers)
+    downloaded_rows = len(data)
+    if last_date is not None:
+        kept = existing[(parse_dates(existing['Data']).dt.date < start).to_numpy()]
+        data = pd.concat([kept, data], ignore_index=True)
+    temporary_path = file_path + '.tmp'
+    with fetcher.hooks.stage('save_data'):
+        save_to_csv(data, temporary_path)
+    os.replace(temporary_path, file_path)
+    return downloaded_rows
+
+
+def create_planner(number, window_days=0, max_window_days=0):
+    '''
+    Creates WindowPlanner for the source selected by number with settings from WINDOW_PLANS. If window_days is higher than 0, 
+    all windows have the same size: the largest window of the calendar grid not longer than window_days days (see GRID_WINDOWS).
+    If max_window_days is higher than 0, it replaces max_days from WINDOW_PLANS.
+    Returns None for sources without windows (source 3).
+    '''
+    if number not in WINDOW_PLANS:
+        return None
+    plan = dict(WINDOW_PLANS[number])
+    if max_window_days > 0:
+        plan['max_days'] = max_window_days
+    if window_days > 0:
+        plan.update(initial_days=window_days, min_days=window_days,
+                    max_days=window_days)
+    return WindowPlanner(**plan)
+
+
+def format_planner_summary(summary):
+    '''
+    Returns text with summary of WindowPlanner (see WindowPlanner.summary).
+    '''
+    if not summary['requests']:
+        return 'No periods downloaded (all of them were saved before).'
+    return '{} periods downloaded ({} days, windows from {} to {} days), {:.2f} MB in {:.2f} s'.format(
+        summary['requests'], summary['days'], min(summary['window_days']), max(summary['window_days']),
+        summary['bytes'] / 1024 ** 2, summary['seconds'])
+
+
+class PromptOption(click.Option):
+    '''
+    Option which asks for the missing value only if option --no_input is not used. With --no_input the default value is used
+    and missing required options end the command at once, so the command can be used in scripts without waiting for input.
+    '''
+
+    def prompt_for_value(self, ctx):
+        if ctx.params.get('no_input'):
+            return self.get_default(ctx)
+        return super().prompt_for_value(ctx)
+
+
+def add_fetch_options(command):
+    '''
+    Adds options used to configure downloading (workers, rate limit, cache, timeout, retries and statistics) to the click command.
+    '''
+    options = [
+        click.option('--workers', '-w', type=click.IntRange(min=1), default=1, show_default=True,
+                     help="Number of periods (or days for the 3rd option) downloaded at the same time."),
+        click.option('--rate_limit', '-rl', type=float, default=5, show_default=True,
+                     help="Maximum number of requests per second sent to one host. Paste 0 to turn off the limit."),
+        click.option('--cache_dir', '-cd', type=str, default='',
+                     help="Folder of the cache with downloaded responses. Default is ~/.cache/fetch_data_tge_pse."),
+        click.option('--no_cache', type=bool, is_flag=True,
+                     help="Download everything again, without reading or saving the cache."),
+        click.option('--cache_size', type=click.IntRange(min=1), default=500, show_default=True,
+                     help="Maximum size of the cache in MB."),
+        click.option('--timeout', type=click.FloatRange(min=0, min_open=True), default=30, show_default=True,
+                     help="Timeout of every request in seconds."),
+        click.option('--retries', type=click.IntRange(min=0), default=3, show_default=True,
+                     help="Number of retries of failed requests (connection errors, timeouts, status 429 or 5xx)."),
+        click.option('--stats', type=bool, is_flag=True,
+                     help="Show summary of requests (latency, bytes, retries) and time of every stage (parsing, saving)."),
+        click.option('--stats_json', type=str, default='',
+                     help="Save summary of requests and stages to the json file."),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+def create_fetcher(workers=1, rate_limit=5, cache_dir='', no_cache=False, cache_size=500, timeout=30, retries=3, stats=False):
+    '''
+    Creates Fetcher with session for workers threads, rate limiter and cache (if no_cache is False).
+    Cache_dir is the folder of the cache (default get_default_cache_dir()), cache_size is the maximum size of cache in MB.
+    Timeout and retries are used for every request (see Fetcher). If stats is True, hooks of the fetcher are FetchStats.
+    '''
+    cache = None
+    if not no_cache:
+        cache = ResponseCache(cache_dir or get_default_cache_dir(),
+                              max_size=cache_size * 1024 ** 2)
+    hooks = FetchStats() if stats else None
+    return Fetcher(create_session(workers), RateLimiter(rate_limit), timeout, cache, retries, hooks=hooks)
+
+
+def report_stats(fetcher, stats=False, stats_json='', windows=None):
+    '''
+    Shows summary of FetchStats of the fetcher if stats is True and saves it to the json file stats_json if it is given.
+    Windows is a dictionary with summaries of WindowPlanner (see WindowPlanner.summary) for names of downloads,
+    they are shown and saved under the key windows together with the summary.
+    '''
+    windows = windows or {}
+    if stats:
+        click.echo(fetcher.hooks.format_summary())
+        for name, summary in windows.items():
+            click.echo(name + ': ' + format_planner_summary(summary))
+    if stats_json:
+        summary = fetcher.hooks.summary()
+        if windows:
+            summary['windows'] = windows
+        with open(stats_json, 'w', encoding='utf-8') as file:
+            json.dump(summary, file, indent=2)
+
+
+def get_source_number(source):
+    '''
+    Returns number of the source (see get_url_base_link) selected by number or by name (see get_source_name), 
+    e.g. 1 or 'PL_WYK_KSE'. Names EE_RDN and EE_RDN_statistics select source 3.
+    '''
+    if source in (1, 2, 3):
+        return source
+    names = {get_source_name(number): number for number in (1, 2, 3)}
+    names['EE_RDN_statistics'] = 3
+    if source not in names:
+        raise Exception("Wrong source. Choose number from 1 to 3 or one of names: " + ', '.join(names))
+    return names[source]
+
+
+def create_library_fetcher(session=None, cache=None, fetcher=None, workers=1, rate_limit=5, timeout=30, retries=3):
+    '''
+    Returns fetcher if it is given, otherwise creates Fetcher with session (default create_session(workers)), 
+    RateLimiter(rate_limit) and cache (ResponseCache or None, then nothing is saved on disk).
+    '''
+    if fetcher is not None:
+        return fetcher
+    if session is None:
+        session = create_session(workers)
+    return Fetcher(session, RateLimiter(rate_limit), timeout, cache, retries)
+
+
+def iter_fetch(source, date_from, date_to, statistics=False, session=None, cache=None, fetcher=None, workers=1,
+               rate_limit=5, timeout=30, retries=3, window_days=0, max_window_days=0, normalize=False, timezone='UTC',
+               parse_processes=0):
+    '''
+    Python API of download_data without saving files. Generator which yields dataframes (one for every period of sources 1 and 2
+    or every day of source 3) with data from source (number or name, see get_source_number) between date_from and date_to
+    (format YYYY-MM-DD). Statistics is True by default for source name EE_RDN_statistics.
+    Session (e.g. requests.Session) and cache (ResponseCache) can be given to share them with other code, 
+    or the whole fetcher (Fetcher) can be given instead. If normalize is True, dataframes have typed columns 
+    and index with the start of every hour in timezone (see normalize_data). Other parameters are the same as in download_data.
+    '''
+    number = get_source_number(source)
+    statistics = statistics or source == 'EE_RDN_statistics'
+    fetcher = create_library_fetcher(session, cache, fetcher, workers, rate_limit, timeout, retries)
+    planner = create_planner(number, window_days, max_window_days)
+    for chunk in iter_source_data(number, date_from, date_to, statistics, fetcher, workers, planner=planner,
+                                  parse_processes=parse_processes):
+        yield normalize_data(chunk, timezone=timezone) if normalize else chunk
+
+
+def fetch(source, date_from, date_to, statistics=False, session=None, cache=None, fetcher=None, workers=1,
+          rate_limit=5, timeout=30, retries=3, window_days=0, max_window_days=0, types=False, normalize=False, timezone='UTC',
+          parse_processes=0):
+    '''
+    Python API of download_data without saving files. Returns dataframe with data from source (number or name, 
+    see get_source_number) between date_from and date_to (format YYYY-MM-DD), the same as saved in the csv file by download_data.
+    If types is True, numbers are converted to floats and dates to datetimes (see convert_types).
+    If normalize is True, dataframe has typed columns and index with the start of every hour in timezone (see normalize_data).
+    Other parameters are the same as in iter_fetch, e.g. fetch('PL_WYK_KSE', '2022-01-01', '2022-12-31', workers=4).
+    '''
+    data = pd.concat(iter_fetch(source, date_from, date_to, statistics, session, cache, fetcher, workers,
+                                rate_limit, timeout, retries, window_days, max_window_days,
+                                parse_processes=parse_processes), ignore_index=True)
+    # all chunks are normalized at once, it is much faster than normalizing every chunk
+    if normalize:
+        return normalize_data(data, timezone=timezone)
+    return convert_types(data) if types else data
+
+
+def read_batch_config(path):
+    '''
+    Reads json file with the list of downloads used by run_batch, e.g.
+    {"folder_path": "data", "jobs": [{"number": 1, "date_from": "2022-01-01", "date_to": "2022-12-31"},
+    {"number": 3, "date_from": "2022-12-01", "date_to": "2022-12-02", "statistics": true, "format": "parquet"}]}.
+    Folder_path is optional. Returns tuple (jobs, folder_path).
+    '''
+    with open(path, encoding='utf-8') as file:
+        config = json.load(file)
+    jobs = config.get('jobs', [])
+    for job in jobs:
+        if not {'number', 'date_from', 'date_to'} <= set(job):
+            raise Exception("Every job needs number, date_from and date_to.")
+    return jobs, config.get('folder_path', '')
+
+
+def run_batch_job(job, folder_path, fetcher, workers=1, store=None):
+    '''
+    Downloads and saves data of one job of run_batch (dictionary with number, date_from, date_to and optional
+    statistics, format and partition). Every downloaded period (or day) is saved at once (see save_data_chunks).
+    If store (DataStore) is given, the data is also saved in the store (see store_chunks).
+    Returns dictionary with source, paths, rows, requests, bytes (received from the server), content_bytes (after decompression),
+    cache_hits, not_modified (responses with status 304), retries, seconds and windows (summary of WindowPlanner 
+    or None for source 3).
+    '''
+    start = time.perf_counter()
+    number = job['number']
+    statistics = job.get('statistics', False)
+    source = get_source_name(number, statistics)
+    filename = source + '_' + job['date_from'] + '_' + job['date_to']
+    rows = collections.Counter()
+
+    def count_rows(chunks):
+        for chunk in chunks:
+            rows['rows'] += len(chunk)
+            yield chunk
+
+    planner = create_planner(number)
+    chunks = iter_source_data(number, job['date_from'], job['date_to'], statistics,
+                              fetcher, workers, planner=planner)
+    if store is not None:
+        chunks = store_chunks(chunks, store, get_source_name(number), fetcher.hooks)
+    paths = save_data_chunks(count_rows(chunks), filename, folder_path, job.get('format', 'csv'),
+                             job.get('partition', False), source)
+    result = {'source': source, 'paths': paths, 'rows': rows['rows'],
+              'seconds': time.perf_counter() - start,
+              'windows': planner.summary() if planner is not None else None}
+    for name in ['requests', 'bytes', 'content_bytes', 'cache_hits', 'not_modified', 'retries']:
+        result[name] = fetcher.counters[name]
+    return result
+
+
+def run_batch(jobs, folder_path, fetcher=None, workers=1, store=None):
+    '''
+    Downloads data of all jobs (see run_batch_job) at the same time. All jobs use one session (pool of connections),
+    one rate limiter, one cache and one pool of workers download threads, so workers is the number of requests
+    sent at the same time by the whole batch. Every job is saved to its own file in folder_path.
+    Hooks of fetcher are used by all jobs. If store (DataStore) is given, data of all jobs is also saved in the store.
+    Returns list with results of jobs (in the same order as jobs), see run_batch_job. 
+    If any job fails, the error is raised after all jobs are finished.
+    '''
+    if fetcher is None:
+        fetcher = Fetcher()
+    with ThreadPoolExecutor(max_workers=workers) as download_pool, \
+            ThreadPoolExecutor(max_workers=max(len(jobs), 1)) as job_pool:
+        futures = []
+        for job in jobs:
+            futures.append(job_pool.submit(
+                run_batch_job, job, folder_path, fetcher.share(download_pool), workers, store))
+        concurrent.futures.wait(futures)
+    return [future.result() for future in futures]
+
+
+def format_batch_summary(results, seconds):
+    '''
+    Returns text with one line for every result of run_batch and the line with totals. Seconds is the time of the whole batch.
+    '''
+    lines = []
+    line = '{:<20} {:>9} rows {:>6} requests {:>6} cached {:>6} not modified {:>9.2f} MB ({:.2f} MB decompressed) {:>8.2f} s'
+    for result in results:
+        lines.append(line.format(result['source'], result['rows'], result['requests'], result['cache_hits'],
+                                 result['not_modified'], result['bytes'] / 1024 ** 2, result['content_bytes'] / 1024 ** 2,
+                                 result['seconds']))
+    lines.append(line.format('Total', sum(result['rows'] for result in results),
+                             sum(result['requests'] for result in results),
+                             sum(result['cache_hits'] for result in results),
+                             sum(result['not_modified'] for result in results),
+                             sum(result['bytes'] for result in results) / 1024 ** 2,
+                             sum(result['content_bytes'] for result in results) / 1024 ** 2, seconds))
+    return '\n'.join(lines)
+
+
+PANEL_SOURCES = (1, 3)
+
+
+def get_local_midnight(day, timezone='UTC'):
+    '''
+    Returns timestamp of the polish midnight (Europe/Warsaw) at the beginning of day (date or text YYYY-MM-DD) in timezone.
+    '''
+    return pd.Timestamp(day).tz_localize('Europe/Warsaw').tz_convert(timezone)
+
+
+def get_panel_source(number, date_from, date_to, fetcher=None, workers=1, timezone='UTC'):
+    '''
+    Downloads data from the source selected by number between date_from and date_to (format YYYY-MM-DD) for the hourly panel
+    (see build_panel). Returns normalized dataframe (see normalize_data) sorted by the index, with columns prefixed 
+    with the name of the source (see get_source_name). Data of source 2 is summed over all generating units in every hour.
+    '''
+    start = datetime.strptime(date_from, '%Y-%m-%d').date()
+    end = datetime.strptime(date_to, '%Y-%m-%d').date()
+    if number in (1, 2):
+        # www.pse.pl needs date_from below date_to
+        start = min(start, end - timedelta(days=1))
+    data = fetch(number, start.strftime('%Y-%m-%d'), date_to, fetcher=fetcher, workers=workers,
+                 normalize=True, timezone=timezone)
+    data = data.sort_index(kind='stable')
+    if number == 2:
+        data = data.select_dtypes('number').groupby(level=0, sort=True).sum(min_count=1)
+    data = data[~data.index.duplicated(keep='last')]
+    data = data[(data.index >= get_local_midnight(date_from, timezone)) &
+                (data.index < get_local_midnight(end + timedelta(days=1), timezone))]
+    return data.add_prefix(get_source_name(number) + ' - ')
+
+
+def build_panel(date_from, date_to, generation=False, fetcher=None, workers=1, timezone='UTC'):
+    '''
+    Downloads sources 1 (PL_WYK_KSE) and 3 (EE_RDN) and, if generation is True, source 2 (PL_GEN_MOC_JW_EPS, summed over
+    generating units) between date_from and date_to (format YYYY-MM-DD) at the same time, sharing fetcher 
+    and one pool of workers download threads (like run_batch). Returns hourly panel: dataframe with index 'timestamp'
+    (start of every hour in timezone) and typed columns of all sources. Sources are joined on their sorted indexes,
+    hours missing in a source have missing values.
+    '''
+    if fetcher is None:
+        fetcher = Fetcher()
+    numbers = PANEL_SOURCES + ((2,) if generation else ())
+    with ThreadPoolExecutor(max_workers=workers) as download_pool, \
+            ThreadPoolExecutor(max_workers=len(numbers)) as source_pool:
+        futures = [source_pool.submit(get_panel_source, number, date_from, date_to, fetcher.share(download_pool),
+                                      workers, timezone) for number in numbers]
+        concurrent.futures.wait(futures)
+        sources = [future.result() for future in futures]
+    with fetcher.hooks.stage('join'):
+        panel = pd.concat(sources, axis=1, join='outer', sort=True)
+    panel.index.name = 'timestamp'
+    return panel
+
+
+def read_panel(file_path, timezone='UTC'):
+    '''
+    Reads panel saved by save_panel (parquet or csv file, selected by the extension). Returns dataframe with index in timezone.
+    '''
+    if file_path.endswith('.parquet'):
+        panel = pd.read_parquet(file_path)
+    else:
+        panel = pd.read_csv(file_path, index_col='timestamp', encoding='utf-8')
+        panel.index = pd.to_datetime(panel.index, utc=True)
+    panel.index = panel.index.tz_convert(timezone)
+    return panel
+
+
+def save_panel(panel, file_path):
+    '''
+    Saves panel to the parquet or csv file (selected by the extension of file_path, csv has timestamps in ISO format).
+    The file is replaced at once, so readers never see partly written file.
+    '''
+    temporary_path = file_path + '.tmp'
+    if file_path.endswith('.parquet'):
+        panel.to_parquet(temporary_path)
+    else:
+        panel.to_csv(temporary_path, encoding='utf-8', date_format='%Y-%m-%dT%H:%M:%S%z')
+    os.replace(temporary_path, file_path)
+
+
+def update_panel(file_path, date_to, date_from='', generation=False, fetcher=None, workers=1, timezone='UTC'):
+    '''
+    Updates panel saved in file_path (see save_panel) up to date_to (format YYYY-MM-DD). Only days from the last polish day
+    saved in the file (it can be incomplete) to date_to are downloaded (see build_panel) and replace rows of these days.
+    If file does not exist, panel from date_from to date_to is built. Running it again with the same date_to gives
+    the same file. Returns number of downloaded rows.
+    '''
+    existing = read_panel(file_path, timezone) if os.path.exists(file_path) else None
+    if existing is None or existing.empty:
+        if not date_from:
+            raise Exception(
+                "File is empty or does not exist. Paste date_from to build the first panel.")
+        start = date_from
+    else:
+        start = existing.index.max().tz_convert('Europe/Warsaw').strftime('%Y-%m-%d')
+    if start > date_to:
+        return 0
+    panel = build_panel(start, date_to, generation, fetcher, workers, timezone)
+    downloaded_rows = len(panel)
+    if existing is not None and not existing.empty:
+        kept = existing[existing.index < get_local_midnight(start, timezone)]
+        panel = pd.concat([kept, panel], sort=False)
+        panel.index.name = 'timestamp'
+    save_panel(panel, file_path)
+    return downloaded_rows
+
+
+def store_chunks(chunks, store, source, hooks=None):
+    '''
+    Generator which saves every chunk (dataframe yielded by iter_source_data) of the source (name, see get_source_name)
+    in store (DataStore) as normalized rows and yields the chunk unchanged. Time of saving is measured by hooks (FetchHooks).
+    '''
+    if hooks is None:
+        hooks = FetchHooks()
+    for chunk in chunks:
+        with hooks.stage('store'):
+            store.upsert(source, normalize_data(chunk))
+        yield chunk
+
+
+# columns of the primary key of tables of DataStore (after timestamp) for every source
+STORE_KEYS = {'PL_WYK_KSE': (), 'PL_GEN_MOC_JW_EPS': ('Kod',), 'EE_RDN': ()}
+
+
+class DataStore:
+    '''
+    Local SQLite database (file path) with downloaded data. Data of every source is saved in its own table with normalized 
+    rows (see normalize_data): column timestamp (start of the hour, seconds since 1970-01-01 UTC), numbers and text columns.
+    Timestamp and key columns of the source from STORE_KEYS (e.g. code of the generating unit) are the primary key 
+    of the table (table is sorted by it), so ranges of dates are read from the index and rows downloaded again 
+    (e.g. overlapping periods) replace saved rows.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def connect(self):
+        '''
+        Returns new connection to the database.
+        '''
+        return sqlite3.connect(self.path)
+
+    def get_sources(self):
+        '''
+        Returns sorted list of names of sources saved in the database.
+        '''
+        with contextlib.closing(self.connect()) as connection:
+            rows = connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name").fetchall()
+        return [name for name, in rows]
+
+    def get_columns(self, connection, source):
+        '''
+        Returns list of columns of the table of the source (empty if the table does not exist).
+        '''
+        return [row[1] for row in connection.execute('PRAGMA table_info("{}")'.format(source))]
+
+    def upsert(self, source, dataframe):
+        '''
+        Saves normalized dataframe (see normalize_data) of the source (name, see get_source_name). Rows with the same
+        timestamp and key columns (see STORE_KEYS) as saved rows replace them. Columns missing in the table are added,
+        numeric columns as REAL columns and other columns as TEXT columns. Returns number of saved rows.
+        '''
+        if dataframe.empty:
+            return 0
+        key_columns = list(STORE_KEYS.get(source, ()))
+        missing_keys = [column for column in key_columns if column not in dataframe.columns]
+        if missing_keys:
+            raise Exception("Data of {} has no key columns: {}.".format(source, ', '.join(missing_keys)))
+
+        def get_type(column):
+            if column in key_columns:
+                return 'TEXT NOT NULL'
+            # a column without any values yet is numeric, like in convert_types
+            data = dataframe[column]
+            return 'REAL' if pd.api.types.is_numeric_dtype(data) or data.isna().all() else 'TEXT'
+
+        columns = ['timestamp'] + list(dataframe.columns)
+        values = dataframe.astype(object).where(dataframe.notna(), None)
+        for column in key_columns:
+            values[column] = dataframe[column].fillna('').astype(str)
+        values.insert(0, 'timestamp', dataframe.index.tz_convert('UTC').as_unit('s').asi8.tolist())
+        with self.lock, contextlib.closing(self.connect()) as connection, connection:
+            saved_columns = self.get_columns(connection, source)
+            if not saved_columns:
+                definitions = ['"timestamp" INTEGER NOT NULL'] + [
+                    '"{}" {}'.format(column, get_type(column)) for column in dataframe.columns]
+                key = ', '.join('"{}"'.format(column) for column in ['timestamp'] + key_columns)
+                connection.execute('CREATE TABLE "{}" ({}, PRIMARY KEY ({})) WITHOUT ROWID'.format(
+                    source, ', '.join(definitions), key))
+            for column in dataframe.columns:
+                if saved_columns and column not in saved_columns:
+                    connection.execute('ALTER TABLE "{}" ADD COLUMN "{}" {}'.format(
+                        source, column, get_type(column)))
+            connection.executemany('INSERT OR REPLACE INTO "{}" ({}) VALUES ({})'.format(
+                source, ', '.join('"{}"'.format(column) for column in columns), ', '.join('?' * len(columns))),
+                values.itertuples(index=False, name=None))
+        return len(values)
+
+    def query(self, source, date_from='', date_to='', timezone='UTC'):
+        '''
+        Returns dataframe with data of the source (name or number, see get_source_number) saved between polish days date_from
+        and date_to (format YYYY-MM-DD, empty means no limit), with index timestamp in timezone, sorted by the index.
+        '''
+        source = get_source_name(get_source_number(source))
+        conditions, parameters = [], []
+        if date_from:
+            conditions.append('"timestamp" >= ?')
+            parameters.append(int(get_local_midnight(date_from).timestamp()))
+        if date_to:
+            conditions.append('"timestamp" < ?')
+            parameters.append(int(get_local_midnight(
+                datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)).timestamp()))
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        with contextlib.closing(self.connect()) as connection:
+            if source not in self.get_sources():
+                raise Exception("Source {} is not saved in {}.".format(source, self.path))
+            cursor = connection.execute('SELECT * FROM "{}"{} ORDER BY "timestamp"'.format(source, where), parameters)
+            columns = [description[0] for description in cursor.description]
+            data = pd.DataFrame(cursor.fetchall(), columns=columns)
+        data.index = pd.DatetimeIndex(pd.to_datetime(data.pop('timestamp'), unit='s', utc=True),
+                                      name='timestamp').tz_convert(timezone)
+        return data
+
+
 @click.command()
-@click.option('--number', '-n', type=int, required=True, prompt="Select one number from the list below to download table: \n 1 - Praca KSE - Wielkości podstawowe  \n 2 - Praca KSE - Generacja mocy Jednostek Wytwórczych \n 3 - TGE RDN - Kontrakty godzinowe \n", help="Paste 1 or 2 or 3")
-@click.option('--date_from', '-df', type=str, required=True, prompt="Enter the start date in format YYYY-MM-DD for data download\n", help="Paste date in format YYYY-MM-DD")
-@click.option('--date_to', '-dt', type=str, required=True, prompt="Enter the end date in format YYYY-MM-DD for data download\n", help="Paste date in format YYYY-MM-DD")
-@click.option('--folder_path', '-fp', type=str, default='', required=False, show_default=True, prompt="Paste directory where to save the file (optional)\n", help="Paste folder path or click enter to skip.")
-@click.option('--statistics', '-s', type=bool, required=False, is_flag=True, show_default=True, prompt="Do you want to download statistics (only for the 3rd option)?\n", help="Paste Y or n or click enter to skip.")
-def download_data(number, date_from, date_to, folder_path=None, statistics=False):
+@click.option('--no_input', type=bool, is_flag=True, is_eager=True, envvar='FETCH_DATA_NO_INPUT', help="Do not ask for missing options, use default values. Can be set with environment variable FETCH_DATA_NO_INPUT=1.")
+@click.option('--number', '-n', cls=PromptOption, type=int, required=True, prompt="Select one number from the list below to download table: \n 1 - Praca KSE - Wielkości podstawowe  \n 2 - Praca KSE - Generacja mocy Jednostek Wytwórczych \n 3 - TGE RDN - Kontrakty godzinowe \n", help="Paste 1 or 2 or 3")
+@click.option('--date_from', '-df', cls=PromptOption, type=str, required=True, prompt="Enter the start date in format YYYY-MM-DD for data download\n", help="Paste date in format YYYY-MM-DD")
+@click.option('--date_to', '-dt', cls=PromptOption, type=str, required=True, prompt="Enter the end date in format YYYY-MM-DD for data download\n", help="Paste date in format YYYY-MM-DD")
+@click.option('--folder_path', '-fp', cls=PromptOption, type=str, default='', required=False, show_default=True, prompt="Paste directory where to save the file (optional)\n", help="Paste folder path or click enter to skip.")
+@click.option('--statistics', '-s', cls=PromptOption, type=bool, required=False, is_flag=True, show_default=True, prompt="Do you want to download statistics (only for the 3rd option)?\n", help="Paste Y or n or click enter to skip.")
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'parquet', 'feather']), default='csv', show_default=True, help="Format of the saved file. Parquet and feather files have typed columns.")
+@click.option('--partition', type=bool, is_flag=True, help="Save the data as a dataset partitioned by source and month.")
+@click.option('--stream', type=bool, is_flag=True, help="Save every downloaded period or day to the file at once, so the whole data is never kept in memory.")
+@click.option('--resume', type=bool, is_flag=True, help="Continue interrupted download, periods or days finished before are not downloaded again.")
+@click.option('--window_days', type=click.IntRange(min=0), default=0, show_default=True, help="Maximum number of days in every period downloaded from www.pse.pl, all periods have the same size. 0 means that periods are sized by size and time of responses.")
+@click.option('--max_window_days', type=click.IntRange(min=0), default=0, show_default=True, help="Maximum number of days in one period downloaded from www.pse.pl. 0 means default limit of the source.")
+@click.option('--store', type=str, default='', help="Path to the SQLite database where the data is also saved (see Fetch_data_TGE_PSE_query).")
+@click.option('--parse_processes', type=click.IntRange(min=0), default=0, show_default=True, help="Number of processes which parse pages downloaded from www.tge.pl. 0 means that pages are parsed in the main process.")
+@add_fetch_options
+def download_data(number, date_from, date_to, folder_path=None, statistics=False, file_format='csv', partition=False, stream=False, resume=False, window_days=0, max_window_days=0, workers=1, rate_limit=5, cache_dir='', no_cache=False, cache_size=500, timeout=30, retries=3, stats=False, stats_json='', no_input=False, store='', parse_processes=0):
     """ 
     Main function to download data from the source, prepare the data and save it to the csv file.\n
+    If parameter no_input is True, missing parameters are not asked in the prompt (default values are used).\n
     Parameter number is used to select source of the data. It has to be integer between 1 and 3, where: \n 
         1 - Praca KSE - Wielkości podstawowe \n 
         2 - Praca KSE - Generacja mocy Jednostek Wytwórczych \n
@@ -213,55 +1982,210 @@ def download_data(number, date_from, date_to, folder_path=None, statistics=False
     Parameter date_to definies end date of data period. It has to be in format YYYY-MM-DD.\n
     Parameter folder_path is used to definie path where the csv file has to be saved. Default is the current working directory.\n
     Parameter statistics is useful only for option 3 - TGE RDN - Kontrakty godzinowe, for others options it has no impact.\n
-    If parameter statistics is True, Min, Max, Sum values shown in the bottom of the table are downloaded. Default is False.
+    If parameter statistics is True, Min, Max, Sum values shown in the bottom of the table are downloaded. Default is False.\n
+    Parameter file_format definies format of the saved file: csv (default), parquet or feather. 
+    Parquet and feather files have numbers saved as floats and dates as datetimes.\n
+    If parameter partition is True, the data is saved in folder_path/dataset partitioned by source and month.\n
+    If parameter stream is True, every period (or day for option 3) is saved to the file just after it is downloaded,
+    so memory usage does not depend on the length of the date range.\n
+    Urls of finished periods (or days) are saved in file .<file name>.job.json in folder_path until the file is saved. 
+    If parameter resume is True, interrupted download is continued with the same periods and finished periods are read 
+    from the cache instead of downloading them again.\n
+    Parameters window_days and max_window_days are used only for options 1 and 2. By default (window_days is 0) periods are sized
+    by size and time of previous responses, up to max_window_days days (default limit depends on the source). 
+    If window_days is higher than 0, every period has the same size, up to window_days days. Periods are months, parts of months
+    or groups of months of the calendar (e.g. January - March), so downloads of overlapping dates use the same responses from the cache.\n
+    Parameter workers definies how many periods of data (or days for option 3) are downloaded at the same time. Default is 1.\n
+    Parameter rate_limit definies maximum number of requests per second sent to one host. Default is 5.\n
+    Downloaded responses are saved in the cache folder cache_dir (default ~/.cache/fetch_data_tge_pse), up to cache_size MB.
+    Data for days older than 2 days is never downloaded again, more recent data is downloaded again after 1 hour.
+    For option 3 days older than 3 months can be used only if they are in the cache. If no_cache is True, cache is not used.\n
+    Parameter timeout is the timeout of every request in seconds (default 30), failed requests are retried up to retries times
+    (default 3) with exponential backoff.\n
+    If parameter stats is True, summary of requests (number, latency, bytes, retries), time of stages 
+    (parsing, creating dataframes, saving) and sizes of periods of options 1 and 2 is shown. Parameter stats_json is the path of the json file where the summary is saved.\n
+    Parameter store is the path to the SQLite database (see DataStore), if it is given, the data is also saved in the database
+    (rows downloaded before are replaced).\n
+    Parameter parse_processes is used only for option 3. If it is higher than 0, downloaded pages are parsed in parse_processes
+    processes at the same time (useful for long periods with statistics). Default is 0 (pages are parsed in the main process).
     """
 
     url = get_url_base_link(number)
-    check_connection(url)
+    validate_dates(number, date_from, date_to)
+    check_connection(url, timeout, retries)
 
     if folder_path == '':
         folder_path = os.getcwd()
 
-    filename = '_' + date_from + '_' + date_to + '.csv'
+    fetcher = create_fetcher(workers, rate_limit, cache_dir, no_cache,
+                             cache_size, timeout, retries, stats or bool(stats_json))
+    source = get_source_name(number, statistics)
+    filename = source + '_' + date_from + '_' + date_to
+    job = BackfillJob(os.path.join(folder_path, '.' + filename + '.job.json'), resume)
+    planner = create_planner(number, window_days, max_window_days)
+    if stream:
+        waiting = collections.Counter()
 
-    if number == 1:
-        if check_dates(date_from, date_to):
-            periods = create_data_periods(date_from, date_to, 31)
-            data = get_pse_data(url, periods)
-            save_to_csv(data, 'PL_WYK_KSE' + filename, folder_path)
-        else:
-            raise Exception("Wrong dates. Date_from should be below date_to.")
-    elif number == 2:
-        if check_dates(date_from, date_to):
-            periods = create_data_periods(date_from, date_to, 31)
-            data = get_pse_data(url, periods)
-            save_to_csv(data, 'PL_GEN_MOC_JW_EPS' + filename, folder_path)
-        else:
-            raise Exception("Wrong dates. Date_from should be below date_to.")
-    elif number == 3:
-        if check_tge_date_conditions(date_from, date_to):
-            periods = create_data_periods(date_from, date_to, 1)
-            find_variables = get_find_variables()
-            first_table = next(get_data_tge(
-                periods, url, find_variables[0], find_variables[1]))
-
-            headers_top = get_header(first_table, 'th', colspan="2")
-            headers_bottom = get_header(first_table, 'th', align="")
-            header = create_one_header(headers_top, headers_bottom)
-
-            table_to_scrape = get_data_tge(
-                periods, url, find_variables[0], find_variables[1])
-            data = fill_tge_dataframe(
-                header, periods, table_to_scrape, statistics=statistics)
-            if statistics:
-                save_to_csv(data, 'EE_RDN_statistics' +
-                            filename, folder_path)
-            else:
-                save_to_csv(data, 'EE_RDN' + filename, folder_path)
-        else:
-            raise Exception(
-                "Check the dates. Date_from should be below or equal to date_to and only data for past 3 months is available.")
+        def measure_waiting(chunks):
+            while True:
+                start = time.perf_counter()
+                chunk = next(chunks, None)
+                waiting['seconds'] += time.perf_counter() - start
+                if chunk is None:
+                    return
+                yield chunk
+
+        chunks = iter_source_data(number, date_from, date_to,
+                                  statistics, fetcher, workers, job, planner, parse_processes)
+        if store:
+            chunks = store_chunks(chunks, DataStore(store), get_source_name(number), fetcher.hooks)
+        start = time.perf_counter()
+        save_data_chunks(measure_waiting(chunks), filename, folder_path,
+                         file_format, partition, source)
+        # time of saving without time of waiting for downloaded chunks
+        fetcher.hooks.on_stage('save_data', time.perf_counter() - start - waiting['seconds'])
     else:
-        raise Exception("Choose number from 1 to 3.")
+        data = get_source_data(number, date_from, date_to,
+                               statistics, fetcher, workers, job, planner, parse_processes)
+        with fetcher.hooks.stage('save_data'):
+            save_data(data, filename, folder_path, file_format, partition, source)
+        if store:
+            with fetcher.hooks.stage('store'):
+                DataStore(store).upsert(get_source_name(number), normalize_data(data))
+    job.remove()
+
+    report_stats(fetcher, stats, stats_json, {filename: planner.summary()} if planner is not None else None)
 
     click.echo('File saved in ' + folder_path)
+
+
+@click.command()
+@click.option('--number', '-n', type=int, required=True, help="Source of the data: 1 - Praca KSE - Wielkości podstawowe, 2 - Praca KSE - Generacja mocy Jednostek Wytwórczych, 3 - TGE RDN - Kontrakty godzinowe.")
+@click.option('--file_path', '-f', type=str, required=True, help="Path to the csv file which has to be updated.")
+@click.option('--date_to', '-dt', type=str, default='', help="End date in format YYYY-MM-DD. Default is today.")
+@click.option('--date_from', '-df', type=str, default='', help="Start date in format YYYY-MM-DD, used only if the file does not exist yet.")
+@click.option('--statistics', '-s', type=bool, is_flag=True, help="Download statistics (only for the 3rd option).")
+@add_fetch_options
+def sync_data(number, file_path, date_to='', date_from='', statistics=False, workers=1, rate_limit=5, cache_dir='', no_cache=False, cache_size=500, timeout=30, retries=3, stats=False, stats_json=''):
+    """
+    Updates the csv file with data from the source. Only data from the last day saved in the file to date_to is downloaded.\n
+    Parameter number is used to select source of the data (like in download_data).\n
+    Parameter file_path is the path to the csv file created by download_data or sync_data.\n
+    Parameter date_to definies end date of data period. It has to be in format YYYY-MM-DD. Default is today.\n
+    Parameter date_from is used only if the file does not exist yet, then data from date_from to date_to is downloaded.\n
+    Other parameters are the same as in download_data.
+    """
+    check_connection(get_url_base_link(number), timeout, retries)
+    if date_to == '':
+        date_to = date.today().strftime('%Y-%m-%d')
+    fetcher = create_fetcher(workers, rate_limit, cache_dir, no_cache,
+                             cache_size, timeout, retries, stats or bool(stats_json))
+    rows = sync_file(number, file_path, date_to, date_from,
+                     statistics, fetcher, workers)
+    click.echo('{} rows downloaded, file {} updated'.format(rows, file_path))
+    report_stats(fetcher, stats, stats_json)
+
+
+@click.command()
+@click.option('--config', '-c', type=str, default='', help="Path to the json file with the list of downloads (see read_batch_config).")
+@click.option('--source', 'sources', type=(int, str, str), multiple=True, help="Number of the source, date_from and date_to, e.g. --source 1 2022-01-01 2022-12-31. Can be used many times.")
+@click.option('--folder_path', '-fp', type=str, default='', help="Folder where files are saved. Default is folder_path from the config or the current working directory.")
+@click.option('--statistics', '-s', type=bool, is_flag=True, help="Download statistics for sources 3 given with --source.")
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'parquet', 'feather']), default='csv', show_default=True, help="Format of files of sources given with --source.")
+@click.option('--store', type=str, default='', help="Path to the SQLite database where the data is also saved (see Fetch_data_TGE_PSE_query).")
+@add_fetch_options
+def batch_download(config='', sources=(), folder_path='', statistics=False, file_format='csv', store='', workers=1, rate_limit=5, cache_dir='', no_cache=False, cache_size=500, timeout=30, retries=3, stats=False, stats_json=''):
+    """
+    Downloads data from many sources in one run and saves every source to its own file.\n
+    Downloads are listed in the json file config (see read_batch_config) or with --source NUMBER DATE_FROM DATE_TO options.\n
+    All downloads share one pool of connections and one pool of workers threads, so workers is the number of requests
+    sent at the same time by the whole batch.\n
+    At the end the summary with rows, requests, responses read from the cache, MB and time of every source is shown.\n
+    If store is given, data of all sources is also saved in the SQLite database (like in download_data).\n
+    Other parameters are the same as in download_data.
+    """
+    jobs = []
+    if config:
+        jobs, config_folder_path = read_batch_config(config)
+        folder_path = folder_path or config_folder_path
+    for number, date_from, date_to in sources:
+        jobs.append({'number': number, 'date_from': date_from, 'date_to': date_to,
+                     'statistics': statistics, 'format': file_format})
+    if not jobs:
+        raise click.UsageError("Paste --config or at least one --source.")
+    if folder_path == '':
+        folder_path = os.getcwd()
+
+    for job in jobs:
+        get_url_base_link(job['number'])
+        validate_dates(job['number'], job['date_from'], job['date_to'])
+    check_connections([job['number'] for job in jobs], timeout, retries)
+
+    fetcher = create_fetcher(workers, rate_limit, cache_dir, no_cache,
+                             cache_size, timeout, retries, stats or bool(stats_json))
+    start = time.perf_counter()
+    results = run_batch(jobs, folder_path, fetcher, workers, DataStore(store) if store else None)
+    click.echo(format_batch_summary(results, time.perf_counter() - start))
+    click.echo('Files saved in ' + folder_path)
+    windows = {result['source'] + '_' + job['date_from'] + '_' + job['date_to']: result['windows']
+               for job, result in zip(jobs, results) if result['windows'] is not None}
+    report_stats(fetcher, stats, stats_json, windows)
+
+
+@click.command()
+@click.option('--file_path', '-f', type=str, required=True, help="Path to the panel file (.parquet or .csv). If it exists, it is updated.")
+@click.option('--date_to', '-dt', type=str, default='', help="End date in format YYYY-MM-DD. Default is today.")
+@click.option('--date_from', '-df', type=str, default='', help="Start date in format YYYY-MM-DD, used only if the file does not exist yet.")
+@click.option('--generation', '-g', type=bool, is_flag=True, help="Add data of generating units (source 2) summed in every hour.")
+@click.option('--timezone', '-tz', type=str, default='UTC', show_default=True, help="Timezone of timestamps, e.g. Europe/Warsaw.")
+@add_fetch_options
+def join_data(file_path, date_to='', date_from='', generation=False, timezone='UTC', workers=1, rate_limit=5, cache_dir='', no_cache=False, cache_size=500, timeout=30, retries=3, stats=False, stats_json=''):
+    """
+    Creates or updates hourly panel which joins Praca KSE - Wielkości podstawowe (source 1) and TGE RDN - Kontrakty godzinowe
+    (source 3) and optionally Praca KSE - Generacja mocy Jednostek Wytwórczych (source 2) summed over all units.\n
+    Every row of the panel is one hour (column timestamp with the start of the hour), columns are prefixed with names of sources.\n
+    Parameter file_path is the path of the parquet or csv file. If the file exists, only days from the last saved day to date_to
+    are downloaded.\n
+    Parameter date_to definies end date of data period. It has to be in format YYYY-MM-DD. Default is today.\n
+    Parameter date_from is used only if the file does not exist yet. Data of TGE is available only for the last 3 months.\n
+    Other parameters are the same as in download_data.
+    """
+    if date_to == '':
+        date_to = date.today().strftime('%Y-%m-%d')
+    if date_from:
+        validate_dates(3, date_from, date_to)
+    check_connections(PANEL_SOURCES + ((2,) if generation else ()), timeout, retries)
+    fetcher = create_fetcher(workers, rate_limit, cache_dir, no_cache,
+                             cache_size, timeout, retries, stats or bool(stats_json))
+    rows = update_panel(file_path, date_to, date_from, generation, fetcher, workers, timezone)
+    click.echo('{} hours downloaded, file {} updated'.format(rows, file_path))
+    report_stats(fetcher, stats, stats_json)
+
+
+@click.command()
+@click.option('--store', type=str, required=True, help="Path to the SQLite database created with option --store of Fetch_data_TGE_PSE.")
+@click.option('--source', type=str, default='', help="Number (1, 2, 3) or name (e.g. EE_RDN) of the source. If it is not given, saved sources are listed.")
+@click.option('--date_from', '-df', type=str, default='', help="Start date in format YYYY-MM-DD. Default is the first saved date.")
+@click.option('--date_to', '-dt', type=str, default='', help="End date in format YYYY-MM-DD. Default is the last saved date.")
+@click.option('--timezone', '-tz', type=str, default='UTC', show_default=True, help="Timezone of timestamps, e.g. Europe/Warsaw.")
+@click.option('--output', '-o', type=str, default='', help="Path to the csv file with the result. Default is the standard output.")
+def query_data(store, source='', date_from='', date_to='', timezone='UTC', output=''):
+    """
+    Reads data saved in the SQLite database (option --store of Fetch_data_TGE_PSE or Fetch_data_TGE_PSE_batch).\n
+    Parameter store is the path to the database.\n
+    Parameter source is the number or the name of the source. If it is not given, names of saved sources are shown.\n
+    Parameters date_from and date_to definie polish days of the data (format YYYY-MM-DD), by default all saved data is read.\n
+    Parameter timezone is the timezone of timestamps (default UTC). Parameter output is the path to the csv file,
+    by default the data is written to the standard output.
+    """
+    data_store = DataStore(store)
+    if not source:
+        for name in data_store.get_sources():
+            click.echo(name)
+        return
+    data = data_store.query(int(source) if source.isdigit() else source, date_from, date_to, timezone)
+    if output:
+        data.to_csv(output, encoding='utf-8', date_format='%Y-%m-%dT%H:%M:%S%z')
+        click.echo('{} rows saved in {}'.format(len(data), output))
+    else:
+        click.echo(data.to_csv(date_format='%Y-%m-%dT%H:%M:%S%z'), nl=False)
@@ -13,9 +13,16 @@ setup(
         'requests',
         'lxml'
     ],
+    extras_require={
+        'columnar': ['pyarrow']
+    },
     version='0.9.0',
     entry_points='''
     [console_scripts]
     Fetch_data_TGE_PSE=fetch_data:download_data
+    Fetch_data_TGE_PSE_sync=fetch_data:sync_data
+    Fetch_data_TGE_PSE_batch=fetch_data:batch_download
+    Fetch_data_TGE_PSE_join=fetch_data:join_data
+    Fetch_data_TGE_PSE_query=fetch_data:query_data
     '''
 )
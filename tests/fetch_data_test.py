@@ -1,9 +1,100 @@
+import gzip
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
-from datetime import date, datetime
+import time
+from datetime import date, datetime, timedelta
 from dateutil.relativedelta import relativedelta
+import pandas as pd
+from bs4 import BeautifulSoup
+import urllib3
+from click.testing import CliRunner
 import fetch_data
 
 
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def read_rdn_html():
+    with open(os.path.join(DATA_FOLDER, 'rdn_02-12-2022.html'), 'rb') as file:
+        return file.read()
+
+
+def read_rdn_table():
+    return BeautifulSoup(read_rdn_html(), 'lxml').find('table', id='footable_kontrakty_godzinowe')
+
+
+class FakeResponse:
+
+    def __init__(self, content, status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise fetch_data.requests.exceptions.HTTPError(self.status_code)
+
+
+class FakeSession:
+
+    def __init__(self, pages, errors=()):
+        self.pages = pages
+        self.errors = list(errors)
+        self.requested = []
+
+    def get(self, url, timeout=None, **kwargs):
+        self.requested.append(url)
+        if self.errors:
+            error = self.errors.pop(0)
+            if isinstance(error, Exception):
+                raise error
+            return FakeResponse(b'', error)
+        return FakeResponse(self.pages[url])
+
+
+class FakePseSession:
+
+    def __init__(self):
+        self.requested = []
+
+    def get(self, url, timeout=None, **kwargs):
+        self.requested.append(url)
+        parts = url.split('/')
+        return FakeResponse(create_pse_csv(parts[-3], parts[-1]))
+
+
+class FakeSourcesSession:
+
+    def __init__(self):
+        self.pse_session = FakePseSession()
+        self.requested = []
+
+    def get(self, url, timeout=None, **kwargs):
+        self.requested.append(url)
+        if url.startswith(fetch_data.get_url_base_link(3).split('?')[0]):
+            return FakeResponse(read_rdn_html())
+        return self.pse_session.get(url)
+
+
+def create_pse_csv(start, end):
+    rows = ['Data;Godz.;Krajowe zapotrzebowanie na moc']
+    for day in pd.date_range(start, end, freq='D'):
+        for hour in range(1, 25):
+            rows.append('{};{};{},5'.format(day.strftime('%Y%m%d'), hour, 15000 + hour))
+    return '\n'.join(rows).encode('cp1250')
+
+
 class FetchDataTest(unittest.TestCase):
 
     def setUp(self):
@@ -26,6 +117,13 @@ class FetchDataTest(unittest.TestCase):
         with self.assertRaises(Exception):
             fetch_data.get_url_base_link('s')
 
+        os.environ['FETCH_DATA_PSE_URL'] = 'http://127.0.0.1:8000'
+        try:
+            self.assertEqual(fetch_data.get_url_base_link(
+                1), 'http://127.0.0.1:8000/getcsv/-/export/csv/PL_WYK_KSE/data_od/{}/data_do/{}')
+        finally:
+            del os.environ['FETCH_DATA_PSE_URL']
+
     def test_check_connection(self):
         with self.assertRaises(Exception):
             fetch_data.check_connection(self.url_fail)
@@ -38,6 +136,34 @@ class FetchDataTest(unittest.TestCase):
         self.assertFalse(fetch_data.check_dates(
             self.date_from, self.date_from))
 
+    def test_validate_dates(self):
+        fetch_data.validate_dates(1, '2022-12-02', '2022-12-03')
+        fetch_data.validate_dates(3, '2022-12-02', '2022-12-02')
+        with self.assertRaises(Exception):
+            fetch_data.validate_dates(1, '2022-12-02', '2022-12-02')
+        with self.assertRaises(Exception):
+            fetch_data.validate_dates(3, '2022-12-03', '2022-12-02')
+        with self.assertRaises(Exception):
+            fetch_data.validate_dates(3, 'test_date', '2022-12-02')
+
+    def test_lazy_imports(self):
+        result = subprocess.run([sys.executable, '-c', 'import sys, fetch_data; print(sorted(m for m in sys.modules if m in '
+                                 '("pandas", "requests", "bs4", "lxml.html", "dateutil.relativedelta", '
+                                 '"multiprocessing", "concurrent.futures.process")))'],
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                capture_output=True, text=True)
+        self.assertEqual(result.stdout.strip(), '[]')
+
+    def test_download_data_no_input(self):
+        runner = CliRunner()
+        result = runner.invoke(fetch_data.download_data, ['--no_input'])
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn('--number', result.output)
+        result = runner.invoke(fetch_data.download_data, [
+            '--no_input', '--number', '1', '--date_from', '2022-12-03', '--date_to', '2022-12-02'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('Wrong dates', str(result.exception))
+
     def test_create_data_periods(self):
         periods = ['02-12-2022', '03-12-2022', '04-12-2022']
         created_periods = fetch_data.create_data_periods(
@@ -53,8 +179,43 @@ class FetchDataTest(unittest.TestCase):
         self.assertRaises(Exception, fetch_data.create_data_periods,
                           '2022-12-02', '2022-12-15', -10)
 
+    def test_create_pse_windows(self):
+        periods = fetch_data.create_data_periods('2022-12-02', '2022-12-15', 10)
+        windows = [(str(start), str(end))
+                   for start, end in fetch_data.create_pse_windows(periods)]
+        self.assertListEqual(windows, [('2022-12-02 00:00:00', '2022-12-08 12:00:00'),
+                                       ('2022-12-09 12:00:00', '2022-12-15 00:00:00')])
+
+    def test_create_pse_urls(self):
+        periods = fetch_data.create_data_periods('2022-12-02', '2022-12-15', 10)
+        urls = fetch_data.create_pse_urls(
+            'data_od/{}/data_do/{}', fetch_data.create_pse_windows(periods))
+        self.assertListEqual(
+            urls, ['data_od/20221202/data_do/20221208', 'data_od/20221209/data_do/20221215'])
+
+    def test_rate_limiter(self):
+        rate_limiter = fetch_data.RateLimiter(20)
+        start = time.monotonic()
+        for _ in range(3):
+            rate_limiter.wait('https://www.pse.pl/a')
+        rate_limiter.wait('https://tge.pl/a')
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
     def test_get_pse_data(self):
-        pass
+        url_base = fetch_data.get_url_base_link(1)
+        periods = fetch_data.create_data_periods('2022-11-01', '2022-12-31', 10)
+        windows = fetch_data.create_pse_windows(periods)
+        urls = fetch_data.create_pse_urls(url_base, windows)
+        session = FakeSession({url: create_pse_csv(start, end)
+                               for url, (start, end) in zip(urls, windows)})
+        fetcher = fetch_data.Fetcher(session=session)
+
+        serial = fetch_data.get_pse_data(url_base, periods, fetcher=fetcher)
+        parallel = fetch_data.get_pse_data(url_base, periods, 4, fetcher)
+        self.assertEqual(len(serial), 61 * 24)
+        self.assertListEqual(serial['Data'].unique().tolist(),
+                             [int(day.strftime('%Y%m%d')) for day in pd.date_range('2022-11-01', '2022-12-31')])
+        pd.testing.assert_frame_equal(serial, parallel)
 
     def test_get_find_variables(self):
         find_variables = fetch_data.get_find_variables(
@@ -78,11 +239,336 @@ class FetchDataTest(unittest.TestCase):
         self.assertFalse(fetch_data.check_tge_date_conditions(
             date_from_tge_far, date_to_tge))
 
+        min_date = date.today() - relativedelta(months=3)
+        cached_dates = {(min_date - timedelta(days=i)).strftime('%d-%m-%Y') for i in range(3)}
+        date_from_cached = datetime.strftime(min_date - timedelta(days=2), '%Y-%m-%d')
+        self.assertTrue(fetch_data.check_tge_date_conditions(
+            date_from_cached, date_to_tge, cached_dates))
+        self.assertFalse(fetch_data.check_tge_date_conditions(
+            date_from_tge_far, date_to_tge, cached_dates))
+
     def test_get_data_tge(self):
-        pass
+        url_base = fetch_data.get_url_base_link(3)
+        dates = fetch_data.create_data_periods('2022-12-02', '2022-12-08')
+        session = FakeSession({url_base.format(day): read_rdn_html() for day in dates})
+        fetcher = fetch_data.Fetcher(session=session)
+        tables = list(fetch_data.get_data_tge(
+            dates, url_base, 'table', 'footable_kontrakty_godzinowe', fetcher, 3))
+        self.assertEqual(len(tables), 7)
+        self.assertEqual(tables[0].get('id'), 'footable_kontrakty_godzinowe')
+        self.assertCountEqual(session.requested, [url_base.format(day) for day in dates])
+
+    def test_fetch_and_parse(self):
+        class SlowFetcher:
+            download_pool = None
+
+            def download(self, url, last_day=None, fresh_only=True):
+                time.sleep(0.01 * (url % 3))
+                return url, True
+
+        results = list(fetch_data.fetch_and_parse(
+            range(20), lambda content: content * 2, SlowFetcher(), 4))
+        self.assertListEqual(results, [i * 2 for i in range(20)])
+
+    def test_response_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = fetch_data.ResponseCache(cache_dir, max_size=25, recent_ttl=0)
+            old_day = date.today() - timedelta(days=30)
+            cache.put('https://www.pse.pl/old', b'0123456789', old_day)
+            cache.put('https://www.pse.pl/recent', b'0123456789', date.today())
+            self.assertEqual(cache.get('https://www.pse.pl/old'), b'0123456789')
+            self.assertIsNone(cache.get('https://www.pse.pl/recent'))
+            self.assertEqual(cache.get('https://www.pse.pl/recent', fresh_only=False), b'0123456789')
+            self.assertIsNone(cache.get('https://www.pse.pl/missing'))
+
+            os.utime(cache.get_path('https://www.pse.pl/recent', '.bin'), (0, 0))
+            cache.put('https://tge.pl/new', b'0123456789', old_day)
+            self.assertFalse(cache.contains('https://www.pse.pl/recent'))
+            self.assertTrue(cache.contains('https://www.pse.pl/old'))
+            self.assertTrue(cache.contains('https://tge.pl/new'))
+            self.assertEqual(fetch_data.ResponseCache(cache_dir).size, 20)
+
+    def test_fetcher_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            session = FakeSession({'https://tge.pl/a': b'page'})
+            fetcher = fetch_data.Fetcher(session=session, cache=fetch_data.ResponseCache(cache_dir))
+            self.assertEqual(fetcher.get('https://tge.pl/a', date(2022, 12, 2)), b'page')
+            self.assertEqual(fetcher.get('https://tge.pl/a', date(2022, 12, 2)), b'page')
+            self.assertListEqual(session.requested, ['https://tge.pl/a'])
+
+    def test_fetcher_conditional_requests(self):
+        class ConditionalSession:
+            def __init__(self):
+                self.headers = []
+
+            def get(self, url, timeout=None, headers=None, **kwargs):
+                self.headers.append(headers or {})
+                if (headers or {}).get('If-None-Match') == '"v1"':
+                    return FakeResponse(b'', 304)
+                return FakeResponse(b'page', headers={'ETag': '"v1"', 'Last-Modified': 'Fri, 02 Dec 2022 10:00:00 GMT'})
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            session = ConditionalSession()
+            cache = fetch_data.ResponseCache(cache_dir, recent_ttl=0)
+            fetcher = fetch_data.Fetcher(session=session, cache=cache)
+            self.assertEqual(fetcher.get('https://tge.pl/a', date.today()), b'page')
+            self.assertEqual(fetcher.get('https://tge.pl/a', date.today()), b'page')
+            self.assertDictEqual(session.headers[1], {'If-None-Match': '"v1"',
+                                                      'If-Modified-Since': 'Fri, 02 Dec 2022 10:00:00 GMT'})
+            self.assertEqual(fetcher.counters['not_modified'], 1)
+            self.assertEqual(cache.get('https://tge.pl/a', fresh_only=False), b'page')
+
+            os.remove(cache.get_path('https://tge.pl/a', '.bin'))
+            self.assertEqual(fetcher.get('https://tge.pl/a', date.today()), b'page')
+            self.assertDictEqual(session.headers[-1], {})
+
+    def test_fetcher_compressed_size(self):
+        content = create_pse_csv('2022-11-01', '2022-11-30')
+        compressed = gzip.compress(content)
+
+        class GzipAdapter(fetch_data.requests.adapters.HTTPAdapter):
+            def send(self, request, **kwargs):
+                self.accept_encoding = request.headers.get('Accept-Encoding')
+                raw = urllib3.HTTPResponse(
+                    body=io.BytesIO(compressed), headers={'Content-Encoding': 'gzip'}, status=200,
+                    preload_content=False, decode_content=True)
+                return self.build_response(request, raw)
+
+        session = fetch_data.create_session()
+        adapter = GzipAdapter()
+        session.mount('https://', adapter)
+        stats = fetch_data.FetchStats()
+        fetcher = fetch_data.Fetcher(session=session, hooks=stats)
+        self.assertEqual(fetcher.get('https://www.pse.pl/a'), content)
+        self.assertIn('gzip', adapter.accept_encoding)
+        summary = stats.summary()
+        self.assertEqual(summary['bytes'], len(compressed))
+        self.assertEqual(summary['content_bytes'], len(content))
+        self.assertLess(summary['bytes'], summary['content_bytes'])
+        self.assertEqual(fetcher.counters['bytes'], len(compressed))
+        self.assertEqual(fetcher.counters['content_bytes'], len(content))
+
+    def test_fetcher_retries(self):
+        session = FakeSession({'https://tge.pl/a': b'page'}, [
+            503, fetch_data.requests.exceptions.ConnectionError()])
+        fetcher = fetch_data.Fetcher(session=session, retries=2, backoff=0)
+        self.assertEqual(fetcher.get('https://tge.pl/a'), b'page')
+        self.assertEqual(len(session.requested), 3)
+
+        session = FakeSession({'https://tge.pl/a': b'page'}, [503, 503, 503])
+        fetcher = fetch_data.Fetcher(session=session, retries=2, backoff=0)
+        with self.assertRaises(fetch_data.requests.exceptions.HTTPError):
+            fetcher.get('https://tge.pl/a')
+
+        session = FakeSession({'https://tge.pl/a': b'page'}, [404])
+        fetcher = fetch_data.Fetcher(session=session, retries=2, backoff=0)
+        with self.assertRaises(fetch_data.requests.exceptions.HTTPError):
+            fetcher.get('https://tge.pl/a')
+        self.assertEqual(len(session.requested), 1)
+
+    def test_fetch_stats(self):
+        stats = fetch_data.FetchStats()
+        session = FakeSession({'https://tge.pl/rdn?02-12-2022': read_rdn_html()}, [503])
+        fetcher = fetch_data.Fetcher(session=session, retries=1, backoff=0, hooks=stats)
+        tables = list(fetch_data.get_rdn_data(['02-12-2022'], 'https://tge.pl/rdn?{}', fetcher=fetcher))
+        self.assertEqual(len(tables), 1)
+        summary = stats.summary()
+        self.assertEqual(summary['requests'], 2)
+        self.assertEqual(summary['failed_requests'], 1)
+        self.assertEqual(summary['retries'], 1)
+        self.assertEqual(summary['bytes'], len(read_rdn_html()))
+        self.assertEqual(summary['content_bytes'], len(read_rdn_html()))
+        self.assertEqual(summary['stages']['extract_rdn_table']['calls'], 1)
+        self.assertIn('extract_rdn_table', stats.format_summary())
+        fetch_data.json.dumps(summary)
+
+    def test_report_stats(self):
+        fetcher = fetch_data.Fetcher(session=FakePseSession(), hooks=fetch_data.FetchStats())
+        planner = fetch_data.create_planner(1)
+        fetch_data.get_source_data(1, '2022-11-01', '2022-12-31', fetcher=fetcher, planner=planner)
+        windows = {'PL_WYK_KSE_2022-11-01_2022-12-31': planner.summary()}
+        with tempfile.TemporaryDirectory() as folder:
+            stats_json = os.path.join(folder, 'stats.json')
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                fetch_data.report_stats(fetcher, False, stats_json, windows)
+            self.assertEqual(output.getvalue(), '')
+            with open(stats_json, encoding='utf-8') as file:
+                summary = fetch_data.json.load(file)
+            self.assertEqual(summary['windows'], windows)
+            self.assertEqual(summary['requests'], windows['PL_WYK_KSE_2022-11-01_2022-12-31']['requests'])
+
+            with contextlib.redirect_stdout(output):
+                fetch_data.report_stats(fetcher, True, '', windows)
+            self.assertIn('PL_WYK_KSE_2022-11-01_2022-12-31: 2 periods downloaded (61 days', output.getvalue())
+
+    def test_backfill_job(self):
+        url_base = fetch_data.get_url_base_link(1)
+        periods = fetch_data.create_data_periods('2022-11-01', '2022-12-31', 10)
+        expected = fetch_data.get_pse_data(
+            url_base, periods, fetcher=fetch_data.Fetcher(session=FakePseSession()))
+        with tempfile.TemporaryDirectory() as folder:
+            job_path = os.path.join(folder, 'job.json')
+            session = FakePseSession()
+            cache = fetch_data.ResponseCache(os.path.join(folder, 'cache'), recent_ttl=0, immutable_days=10 ** 5)
+            fetcher = fetch_data.Fetcher(session=session, cache=cache)
+            frames = fetch_data.iter_pse_data(
+                url_base, periods, fetcher=fetcher, job=fetch_data.BackfillJob(job_path))
+            for _ in range(3):
+                next(frames)
+            frames.close()
+            completed = len(fetch_data.BackfillJob(job_path).completed)
+            self.assertGreaterEqual(completed, 3)
+            self.assertListEqual(sorted(os.listdir(folder)), ['cache', 'job.json'])
+
+            session.requested.clear()
+            resumed = fetch_data.get_pse_data(
+                url_base, periods, fetcher=fetcher, job=fetch_data.BackfillJob(job_path))
+            pd.testing.assert_frame_equal(resumed, expected)
+            self.assertEqual(len(session.requested), len(periods) - 1 - completed)
+
+            job = fetch_data.BackfillJob(job_path, resume=False)
+            self.assertFalse(job.is_done(fetch_data.create_pse_urls(
+                url_base, fetch_data.create_pse_windows(periods))[0]))
+            self.assertFalse(os.path.exists(job_path))
+
+    def test_get_grid_window(self):
+        sizes = {size[:2]: size for size in fetch_data.GRID_WINDOWS}
+        self.assertEqual(fetch_data.get_grid_window(date(2022, 5, 17), sizes[12, 'months']),
+                         (date(2022, 1, 1), date(2022, 12, 31)))
+        self.assertEqual(fetch_data.get_grid_window(date(2022, 5, 17), sizes[3, 'months']),
+                         (date(2022, 4, 1), date(2022, 6, 30)))
+        self.assertEqual(fetch_data.get_grid_window(date(2022, 12, 31), sizes[2, 'months']),
+                         (date(2022, 11, 1), date(2022, 12, 31)))
+        self.assertEqual(fetch_data.get_grid_window(date(2022, 2, 10), sizes[8, 'days']),
+                         (date(2022, 2, 9), date(2022, 2, 16)))
+        self.assertEqual(fetch_data.get_grid_window(date(2022, 3, 31), sizes[2, 'days']),
+                         (date(2022, 3, 27), date(2022, 3, 31)))
+        for size in fetch_data.GRID_WINDOWS:
+            for day in pd.date_range('2024-01-01', '2024-12-31').date:
+                start, end = fetch_data.get_grid_window(day, size)
+                self.assertTrue(start <= day <= end)
+                self.assertTrue(2 <= (end - start).days + 1 <= size[2])
+
+    def test_window_planner(self):
+        planner = fetch_data.WindowPlanner(initial_days=10, min_days=1, max_days=40, target_bytes=1000)
+        windows = planner.create_windows('2022-01-03', '2022-12-31')
+        self.assertEqual(next(windows), (pd.Timestamp('2022-01-01'), pd.Timestamp('2022-01-08')))
+        planner.observe(8, 100, 0.1)
+        self.assertEqual(next(windows), (pd.Timestamp('2022-01-09'), pd.Timestamp('2022-01-16')))
+        planner.observe(8, 100, 0.1)
+        planner.observe(16, 100, 0.1)
+        self.assertEqual(planner.days, 40)
+        self.assertEqual(next(windows), (pd.Timestamp('2022-01-17'), pd.Timestamp('2022-01-31')))
+        self.assertEqual(next(windows), (pd.Timestamp('2022-02-01'), pd.Timestamp('2022-02-28')))
+        planner.observe(31, 100000, 0.1)
+        self.assertEqual(planner.days, 20)
+        self.assertEqual(planner.summary()['requests'], 4)
+
+        windows = list(fetch_data.WindowPlanner(7, 7, 7).create_windows('2022-01-02', '2022-01-20'))
+        self.assertListEqual([(str(start.date()), str(end.date())) for start, end in windows], [
+            ('2022-01-01', '2022-01-04'), ('2022-01-05', '2022-01-08'), ('2022-01-09', '2022-01-12'),
+            ('2022-01-13', '2022-01-16'), ('2022-01-17', '2022-01-20')])
+
+        windows = list(fetch_data.WindowPlanner(366, 1, 366).create_windows('2022-01-01', '2022-03-10'))
+        self.assertListEqual([(str(start.date()), str(end.date())) for start, end in windows], [
+            ('2022-01-01', '2022-03-31')])
+        cached = {(date(2022, 1, 1), date(2022, 1, 31))}
+        windows = list(fetch_data.WindowPlanner(366, 1, 366).create_windows(
+            '2022-01-05', '2022-03-10', lambda start, end: (start, end) in cached))
+        self.assertListEqual([(str(start.date()), str(end.date())) for start, end in windows], [
+            ('2022-01-01', '2022-01-31'), ('2022-02-01', '2022-02-28'), ('2022-03-01', '2022-03-16')])
+
+    def test_window_planner_short_range(self):
+        url_base = fetch_data.get_url_base_link(2)
+        fetcher = fetch_data.Fetcher(session=FakePseSession())
+        for date_from, date_to, days, downloaded_days in [('2024-01-30', '2024-02-03', 5, 9),
+                                                          ('2024-03-25', '2024-04-05', 12, 15)]:
+            planner = fetch_data.create_planner(2)
+            periods = fetch_data.create_data_periods(date_from, date_to, 31)
+            data = pd.concat(fetch_data.iter_pse_data(url_base, periods, fetcher=fetcher, planner=planner),
+                             ignore_index=True)
+            self.assertEqual(len(data), days * 24)
+            self.assertEqual(planner.summary()['requests'], 2)
+            self.assertEqual(planner.summary()['days'], downloaded_days)
+
+    def test_window_planner_resume(self):
+        url_base = fetch_data.get_url_base_link(1)
+        periods = fetch_data.create_data_periods('2020-01-01', '2022-12-31', 31)
+        expected = pd.concat(fetch_data.iter_pse_data(
+            url_base, periods, fetcher=fetch_data.Fetcher(session=FakePseSession()), planner=fetch_data.create_planner(1)),
+            ignore_index=True)
+        with tempfile.TemporaryDirectory() as folder:
+            job_path = os.path.join(folder, 'job.json')
+            session = FakePseSession()
+            fetcher = fetch_data.Fetcher(session=session, cache=fetch_data.ResponseCache(os.path.join(folder, 'cache')))
+            frames = fetch_data.iter_pse_data(url_base, periods, 2, fetcher, fetch_data.BackfillJob(job_path),
+                                              fetch_data.create_planner(1))
+            for _ in range(5):
+                next(frames)
+            frames.close()
+            job = fetch_data.BackfillJob(job_path)
+            interrupted = list(session.requested)
+            self.assertGreaterEqual(len(job.completed), 5)
+
+            session.requested.clear()
+            planner = fetch_data.create_planner(1)
+            resumed = pd.concat(fetch_data.iter_pse_data(url_base, periods, 2, fetcher, job, planner), ignore_index=True)
+            pd.testing.assert_frame_equal(resumed, expected)
+            planned_urls = fetch_data.create_pse_urls(url_base, job.windows)
+            self.assertCountEqual(planned_urls[:len(interrupted)], interrupted)
+            self.assertFalse(set(session.requested) & set(interrupted))
+            self.assertEqual(planner.summary()['requests'], len(session.requested))
+
+            session.requested.clear()
+            planner = fetch_data.create_planner(1)
+            repeated = pd.concat(fetch_data.iter_pse_data(url_base, periods, 2, fetcher, planner=planner),
+                                 ignore_index=True)
+            pd.testing.assert_frame_equal(repeated, expected)
+            self.assertListEqual(session.requested, [])
+            self.assertEqual(planner.summary()['requests'], 0)
+
+    def test_overlapping_downloads(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            session = FakePseSession()
+            fetcher = fetch_data.Fetcher(session=session, cache=fetch_data.ResponseCache(cache_dir))
+            for number in (1, 2):
+                fetch_data.get_source_data(number, '2021-01-01', '2021-12-31', fetcher=fetcher)
+                requested = len(session.requested)
+                data = fetch_data.get_source_data(number, '2021-01-05', '2021-12-20', fetcher=fetcher)
+                self.assertEqual(len(session.requested), requested)
+                self.assertEqual(len(data), 350 * 24)
+                self.assertListEqual(data['Data'].iloc[[0, -1]].tolist(), [20210105, 20211220])
+
+    def test_get_pse_data_planner(self):
+        url_base = fetch_data.get_url_base_link(2)
+        periods = fetch_data.create_data_periods('2022-01-01', '2022-12-31', 31)
+        session = FakePseSession()
+        fetcher = fetch_data.Fetcher(session=session)
+        expected = fetch_data.get_pse_data(url_base, periods, fetcher=fetcher)
+
+        session.requested.clear()
+        planner = fetch_data.create_planner(1)
+        planned = pd.concat(fetch_data.iter_pse_data(url_base, periods, 2, fetcher, planner=planner),
+                            ignore_index=True)
+        pd.testing.assert_frame_equal(planned, expected)
+        self.assertLess(len(session.requested), len(periods) - 1)
+        self.assertEqual(planner.summary()['days'], 365)
+
+        self.assertEqual(fetch_data.create_planner(2, window_days=5).max_days, 5)
+        self.assertEqual(fetch_data.create_planner(2, max_window_days=10).max_days, 10)
+        self.assertIsNone(fetch_data.create_planner(3))
+
+    def test_create_session(self):
+        session = fetch_data.create_session(8)
+        self.assertEqual(session.get_adapter('https://tge.pl')._pool_maxsize, 8)
 
     def test_get_header(self):
-        pass
+        table = read_rdn_table()
+        self.assertListEqual(fetch_data.get_header(table, 'th', colspan="2"),
+                             ['Fixing I', 'Fixing II', 'Notowania ciągłe'])
+        self.assertListEqual(fetch_data.get_header(table, 'th', align="")[:4],
+                             ['\xa0', 'Czas', 'Kurs (PLN/MWh)', 'Wolumen (MWh)'])
 
     def test_create_one_header(self):
         header = fetch_data.create_one_header(['A', 'B'], ['c', 'd', 'd'])
@@ -93,7 +579,358 @@ class FetchDataTest(unittest.TestCase):
         self.assertListEqual(header, ['h', 'e', 'ad', 'er'])
 
     def test_fill_tge_dataframe(self):
-        pass
+        table = read_rdn_table()
+        header = fetch_data.create_one_header(fetch_data.get_header(
+            table, 'th', colspan="2"), fetch_data.get_header(table, 'th', align=""))
+        dates = ['02-12-2022', '03-12-2022']
+
+        df = fetch_data.fill_tge_dataframe(header, dates, iter([table, table]))
+        self.assertEqual(df.shape, (48, 8))
+        self.assertListEqual(df.iloc[0].tolist(), ['02-12-2022', '0-1', '500,00', '1 000,0',
+                                                   '501,00', '2 000,0', '502,00', '3 000,0'])
+        self.assertListEqual(df['Data'].unique().tolist(), dates)
+
+        df = fetch_data.fill_tge_dataframe(
+            header, dates, iter([table, table]), statistics=True)
+        self.assertEqual(df.shape, (54, 8))
+        self.assertListEqual(df['Czas'].tolist()[24:27], ['Min', 'Max', 'Suma'])
+
+        with self.assertRaises(ValueError):
+            fetch_data.fill_tge_dataframe(header[:-1], dates, iter([table]))
+
+    def test_extract_rdn_table(self):
+        table = read_rdn_table()
+        header = fetch_data.create_one_header(fetch_data.get_header(
+            table, 'th', colspan="2"), fetch_data.get_header(table, 'th', align=""))
+        extracted_header, columns = fetch_data.extract_rdn_table(read_rdn_html())
+        self.assertListEqual(extracted_header, header)
+        self.assertEqual(len(columns), 7)
+        self.assertListEqual(columns[0][:2], ['0-1', '1-2'])
+        self.assertEqual(len(columns[0]), 24)
+
+        _, columns = fetch_data.extract_rdn_table(read_rdn_html(), statistics=True)
+        self.assertListEqual(columns[0][-3:], ['Min', 'Max', 'Suma'])
+
+        with self.assertRaises(ValueError):
+            fetch_data.extract_rdn_table(read_rdn_html(), 'wrong_id')
+
+    def test_get_rdn_data_processes(self):
+        dates = ['02-12-2022', '03-12-2022', '04-12-2022']
+        html = read_rdn_html()
+        pages = {'https://tge.pl/rdn?' + date: html.replace(b'0-1', date.encode()) for date in dates}
+        expected = list(fetch_data.get_rdn_data(dates, 'https://tge.pl/rdn?{}', statistics=True,
+                                                fetcher=fetch_data.Fetcher(session=FakeSession(pages))))
+        tables = list(fetch_data.get_rdn_data(dates, 'https://tge.pl/rdn?{}', statistics=True,
+                                              fetcher=fetch_data.Fetcher(session=FakeSession(pages)), parse_processes=2))
+        self.assertEqual(tables, expected)
+        self.assertListEqual([columns[0][0] for _, columns in tables], dates)
+
+    def test_create_rdn_dataframe(self):
+        table = read_rdn_table()
+        header = fetch_data.create_one_header(fetch_data.get_header(
+            table, 'th', colspan="2"), fetch_data.get_header(table, 'th', align=""))
+        dates = ['02-12-2022', '03-12-2022']
+        for statistics in [False, True]:
+            expected = fetch_data.fill_tge_dataframe(
+                header, dates, iter([table, table]), statistics=statistics)
+            tables = [fetch_data.extract_rdn_table(
+                read_rdn_html(), statistics=statistics) for _ in dates]
+            pd.testing.assert_frame_equal(
+                fetch_data.create_rdn_dataframe(dates, tables), expected)
+
+    def test_get_source_name(self):
+        self.assertEqual(fetch_data.get_source_name(1), 'PL_WYK_KSE')
+        self.assertEqual(fetch_data.get_source_name(2), 'PL_GEN_MOC_JW_EPS')
+        self.assertEqual(fetch_data.get_source_name(3, True), 'EE_RDN_statistics')
+        with self.assertRaises(Exception):
+            fetch_data.get_source_name(4)
+
+    def test_parse_dates(self):
+        expected = [datetime(2022, 12, 2), datetime(2022, 12, 31)]
+        for values in [[20221202, 20221231], ['2022-12-02', '2022-12-31'], ['02-12-2022', '31-12-2022']]:
+            self.assertListEqual(fetch_data.parse_dates(values).tolist(), expected)
+        with self.assertRaises(ValueError):
+            fetch_data.parse_dates(['2022/12/02'])
+
+    def test_sync_file(self):
+        session = FakePseSession()
+        fetcher = fetch_data.Fetcher(session=session)
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, 'PL_WYK_KSE.csv')
+            with self.assertRaises(Exception):
+                fetch_data.sync_file(1, file_path, '2022-12-10', fetcher=fetcher)
+
+            rows = fetch_data.sync_file(1, file_path, '2022-12-10', '2022-11-01', fetcher=fetcher)
+            self.assertEqual(rows, 40 * 24)
+            self.assertEqual(len(session.requested), 2)
+
+            session.requested.clear()
+            rows = fetch_data.sync_file(1, file_path, '2022-12-12', fetcher=fetcher)
+            self.assertEqual(rows, 3 * 24)
+            self.assertListEqual(session.requested, [
+                fetch_data.get_url_base_link(1).format('20221209', '20221212')])
+            with open(file_path, 'rb') as file:
+                synced = file.read()
+
+            fetch_data.sync_file(1, file_path, '2022-12-12', fetcher=fetcher)
+            with open(file_path, 'rb') as file:
+                self.assertEqual(file.read(), synced)
+
+            full = fetch_data.get_pse_data(fetch_data.get_url_base_link(1), fetch_data.create_data_periods(
+                '2022-11-01', '2022-12-12', 31), fetcher=fetcher)
+            self.assertEqual(synced.decode('utf-8'), full.to_csv(index=False))
+
+            session.requested.clear()
+            self.assertEqual(fetch_data.sync_file(1, file_path, '2022-12-05', fetcher=fetcher), 0)
+            self.assertListEqual(session.requested, [])
+            with open(file_path, 'rb') as file:
+                self.assertEqual(file.read(), synced)
+
+    def test_run_batch(self):
+        days = [date.today() - timedelta(days=2), date.today() - timedelta(days=1)]
+        jobs = [{'number': 1, 'date_from': '2022-11-01', 'date_to': '2022-12-31'},
+                {'number': 3, 'date_from': days[0].strftime('%Y-%m-%d'), 'date_to': days[1].strftime('%Y-%m-%d'),
+                 'statistics': True}]
+        fetcher = fetch_data.Fetcher(session=FakeSourcesSession())
+        with tempfile.TemporaryDirectory() as folder:
+            results = fetch_data.run_batch(jobs, folder, fetcher, 3)
+            self.assertListEqual([result['source'] for result in results], ['PL_WYK_KSE', 'EE_RDN_statistics'])
+            self.assertEqual(results[0]['rows'], 61 * 24)
+            self.assertEqual(results[1]['rows'], 2 * 27)
+            self.assertEqual(results[1]['requests'], 2)
+            self.assertEqual(results[1]['bytes'], 2 * len(read_rdn_html()))
+            self.assertEqual(results[0]['windows']['days'], 61)
+            self.assertIsNone(results[1]['windows'])
+            for result in results:
+                self.assertTrue(os.path.exists(result['paths'][0]))
+            summary = fetch_data.format_batch_summary(results, 1)
+            self.assertEqual(len(summary.splitlines()), 3)
+            self.assertIn('Total', summary)
+
+            config = os.path.join(folder, 'batch.json')
+            with open(config, 'w', encoding='utf-8') as file:
+                fetch_data.json.dump({'folder_path': folder, 'jobs': jobs}, file)
+            self.assertEqual(fetch_data.read_batch_config(config), (jobs, folder))
+
+    def test_fetch(self):
+        session = FakePseSession()
+        data = fetch_data.fetch('PL_WYK_KSE', '2022-11-01', '2022-12-31', session=session, workers=2)
+        self.assertEqual(len(data), 61 * 24)
+        self.assertListEqual(data.columns.tolist(), ['Data', 'Godz.', 'Krajowe zapotrzebowanie na moc'])
+        chunks = list(fetch_data.iter_fetch(1, '2022-11-01', '2022-12-31', session=session, window_days=10))
+        self.assertEqual(len(chunks), 8)
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), data)
+        typed = fetch_data.fetch(1, '2022-11-01', '2022-11-02', session=session, types=True)
+        self.assertEqual(typed['Krajowe zapotrzebowanie na moc'].dtype, float)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            session = FakePseSession()
+            cache = fetch_data.ResponseCache(cache_dir)
+            fetch_data.fetch(1, '2022-11-01', '2022-11-10', session=session, cache=cache)
+            fetch_data.fetch(1, '2022-11-01', '2022-11-10', session=session, cache=cache)
+            self.assertEqual(len(session.requested), 1)
+        with self.assertRaises(Exception):
+            fetch_data.fetch('PL_OTHER', '2022-11-01', '2022-11-10')
+
+    def test_get_source_number(self):
+        self.assertEqual(fetch_data.get_source_number(2), 2)
+        self.assertEqual(fetch_data.get_source_number('PL_GEN_MOC_JW_EPS'), 2)
+        self.assertEqual(fetch_data.get_source_number('EE_RDN_statistics'), 3)
+
+    def test_build_panel(self):
+        date_from = (date.today() - timedelta(days=5)).strftime('%Y-%m-%d')
+        date_to = (date.today() - timedelta(days=3)).strftime('%Y-%m-%d')
+        fetcher = fetch_data.Fetcher(session=FakeSourcesSession())
+        panel = fetch_data.build_panel(date_from, date_to, True, fetcher, 2, 'Europe/Warsaw')
+        self.assertEqual(panel.index.name, 'timestamp')
+        self.assertTrue(panel.index.is_unique and panel.index.is_monotonic_increasing)
+        self.assertEqual(panel.index[0], pd.Timestamp(date_from, tz='Europe/Warsaw'))
+        self.assertEqual(panel.index[-1].strftime('%Y-%m-%d %H'), date_to + ' 23')
+        self.assertIn('PL_WYK_KSE - Krajowe zapotrzebowanie na moc', panel.columns)
+        self.assertIn('EE_RDN - Fixing I - Kurs (PLN/MWh)', panel.columns)
+        self.assertIn('PL_GEN_MOC_JW_EPS - Krajowe zapotrzebowanie na moc', panel.columns)
+        self.assertFalse(panel.isna().any().any())
+
+    def test_update_panel(self):
+        date_from = (date.today() - timedelta(days=6)).strftime('%Y-%m-%d')
+        date_to = (date.today() - timedelta(days=3)).strftime('%Y-%m-%d')
+        session = FakeSourcesSession()
+        fetcher = fetch_data.Fetcher(session=session)
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, 'panel.csv')
+            with self.assertRaises(Exception):
+                fetch_data.update_panel(file_path, date_to, fetcher=fetcher)
+            self.assertEqual(fetch_data.update_panel(file_path, date_to, date_from, fetcher=fetcher), 4 * 24)
+
+            session.requested.clear()
+            new_date_to = (date.today() - timedelta(days=1)).strftime('%Y-%m-%d')
+            self.assertEqual(fetch_data.update_panel(file_path, new_date_to, fetcher=fetcher), 3 * 24)
+            self.assertEqual(len(session.requested), 4)
+            with open(file_path, 'rb') as file:
+                updated = file.read()
+            fetch_data.update_panel(file_path, new_date_to, fetcher=fetcher)
+            with open(file_path, 'rb') as file:
+                self.assertEqual(file.read(), updated)
+
+            panel = fetch_data.read_panel(file_path)
+            full = fetch_data.build_panel(date_from, new_date_to, fetcher=fetcher)
+            pd.testing.assert_frame_equal(panel, full, check_freq=False)
+
+    def test_data_store(self):
+        data = fetch_data.fetch(1, '2022-11-01', '2022-11-20', session=FakePseSession(), normalize=True)
+        with tempfile.TemporaryDirectory() as folder:
+            store = fetch_data.DataStore(os.path.join(folder, 'data.sqlite'))
+            self.assertEqual(store.upsert('PL_WYK_KSE', data.iloc[:10 * 24]), 10 * 24)
+            self.assertEqual(store.upsert('PL_WYK_KSE', data.iloc[5 * 24:]), 15 * 24)
+            self.assertListEqual(store.get_sources(), ['PL_WYK_KSE'])
+            saved = store.query(1)
+            self.assertEqual(len(saved), 20 * 24)
+            pd.testing.assert_frame_equal(saved, data, check_index_type=False)
+
+            november = store.query('PL_WYK_KSE', '2022-11-03', '2022-11-04', 'Europe/Warsaw')
+            self.assertEqual(len(november), 2 * 24)
+            self.assertEqual(november.index[0], pd.Timestamp('2022-11-03 00:00', tz='Europe/Warsaw'))
+
+            generation = pd.DataFrame({'Kod': ['JW001', 'JW002'], 'Moc': [1.5, None]},
+                                      index=pd.DatetimeIndex(['2022-11-01 00:00'] * 2, tz='UTC', name='timestamp'))
+            store.upsert('PL_GEN_MOC_JW_EPS', generation)
+            store.upsert('PL_GEN_MOC_JW_EPS', generation.assign(Moc=[2.5, 3.5], Nowa=[1.0, 2.0]))
+            saved = store.query(2)
+            self.assertListEqual(saved['Moc'].tolist(), [2.5, 3.5])
+            self.assertListEqual(saved.columns.tolist(), ['Kod', 'Moc', 'Nowa'])
+            with self.assertRaises(Exception):
+                store.query(3)
+            with self.assertRaises(Exception):
+                store.upsert('PL_GEN_MOC_JW_EPS', generation.drop(columns=['Kod']))
+
+            header, columns = fetch_data.extract_rdn_table(read_rdn_html())
+            missing = [columns[0]] + [['-'] * len(column) for column in columns[1:]]
+            chunks = [fetch_data.create_rdn_dataframe(['02-12-2022'], [(header, missing)]),
+                      fetch_data.create_rdn_dataframe(['03-12-2022'], [(header, columns)])]
+            list(fetch_data.store_chunks(iter(chunks), store, 'EE_RDN'))
+            saved = store.query(3)
+            self.assertEqual(len(saved), 2 * 24)
+            self.assertTrue(saved[header[2]].iloc[:24].isna().all())
+            self.assertEqual(saved[header[2]].iloc[24:].notna().sum(), 24)
+
+            store = fetch_data.DataStore(os.path.join(folder, 'missing.sqlite'))
+            hours = pd.date_range('2022-12-04', periods=4, freq='h', tz='UTC', name='timestamp')
+            store.upsert('EE_RDN', pd.DataFrame({'Kurs': pd.Series([None, None], dtype=object)}, index=hours[:2]))
+            store.upsert('EE_RDN', pd.DataFrame({'Kurs': [1.5, None]}, index=hours[2:]))
+            self.assertEqual(store.query(3)['Kurs'].iloc[2], 1.5)
+
+    def test_convert_types(self):
+        df = pd.DataFrame({'Data': ['02-12-2022', '03-12-2022'], 'Czas': ['0-1', '1-2'],
+                           'Kurs': ['1 234,5', '-'], 'Godz.': [1, 2], 'Wolumen': ['-', '-'], 'Moc': [1, 2]})
+        converted = fetch_data.convert_types(df)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(converted['Data']))
+        self.assertListEqual(converted['Czas'].tolist(), ['0-1', '1-2'])
+        self.assertEqual(converted['Kurs'].iloc[0], 1234.5)
+        self.assertTrue(pd.isna(converted['Kurs'].iloc[1]))
+        self.assertListEqual(converted['Godz.'].tolist(), ['1', '2'])
+        self.assertEqual(converted['Wolumen'].dtype, float)
+        self.assertEqual(converted['Moc'].dtype, float)
+        self.assertEqual(df['Kurs'].iloc[0], '1 234,5')
+
+    def test_parse_hours(self):
+        hour_end, hour_order = fetch_data.parse_hours(['1', '2', '2A', '3', '0-1', '23-24', '2-3a', 'Suma'])
+        self.assertListEqual(hour_end[:7].tolist(), [1, 2, 2, 3, 1, 24, 3])
+        self.assertTrue(hour_order[1] < hour_order[2] < hour_order[3])
+        self.assertTrue(pd.isna(hour_end[7]))
+
+    def test_normalize_data(self):
+        df = pd.DataFrame({'Data': [20221029] * 2 + [20221030] * 25 + [20230326] * 23,
+                           'Godz.': [23, 24] + [1, 2, '2A'] + list(range(3, 25)) + list(range(1, 24)),
+                           'Kod': ['JW001'] * 50,
+                           'Moc': ['1 234,5'] * 49 + ['-']})
+        normalized = fetch_data.normalize_data(df)
+        self.assertListEqual(normalized.columns.tolist(), ['Kod', 'Moc'])
+        self.assertEqual(str(normalized.index.tz), 'UTC')
+        self.assertTrue(normalized.index.is_unique and normalized.index.is_monotonic_increasing)
+        self.assertEqual(normalized.index[0], pd.Timestamp('2022-10-29 20:00', tz='UTC'))
+        self.assertEqual(normalized.index[2], pd.Timestamp('2022-10-29 22:00', tz='UTC'))
+        self.assertEqual(normalized.index[26], pd.Timestamp('2022-10-30 22:00', tz='UTC'))
+        self.assertEqual(normalized.index[27], pd.Timestamp('2023-03-25 23:00', tz='UTC'))
+        self.assertEqual(normalized.index[-1], pd.Timestamp('2023-03-26 21:00', tz='UTC'))
+        self.assertEqual(normalized['Moc'].iloc[0], 1234.5)
+        self.assertTrue(pd.isna(normalized['Moc'].iloc[-1]))
+
+        tables = [fetch_data.extract_rdn_table(read_rdn_html(), statistics=True)]
+        rdn = fetch_data.normalize_data(fetch_data.create_rdn_dataframe(['02-12-2022'], tables),
+                                        timezone='Europe/Warsaw')
+        self.assertEqual(len(rdn), 24)
+        self.assertEqual(rdn.index[0], pd.Timestamp('2022-12-02 00:00', tz='Europe/Warsaw'))
+        self.assertTrue(all(dtype == float for dtype in rdn.dtypes))
+
+        data = fetch_data.fetch(1, '2022-11-01', '2022-11-10', session=FakePseSession(), normalize=True)
+        self.assertEqual(len(data), 10 * 24)
+        self.assertEqual(data.index.name, 'timestamp')
+
+    def test_save_data(self):
+        df = pd.DataFrame({'Data': ['30-11-2022', '01-12-2022'], 'Kurs': ['1,5', '2,5']})
+        with tempfile.TemporaryDirectory() as folder:
+            paths = fetch_data.save_data(df, 'EE_RDN', folder)
+            self.assertListEqual(paths, [os.path.join(folder, 'EE_RDN.csv')])
+            pd.testing.assert_frame_equal(pd.read_csv(paths[0], dtype=str), df)
+
+            paths = fetch_data.save_data(df, 'EE_RDN', folder, partition=True, source='EE_RDN')
+            self.assertListEqual(paths, [
+                os.path.join(folder, 'dataset', 'source=EE_RDN', 'month=2022-11', 'EE_RDN.csv'),
+                os.path.join(folder, 'dataset', 'source=EE_RDN', 'month=2022-12', 'EE_RDN.csv')])
+
+            with self.assertRaises(Exception):
+                fetch_data.save_data(df, 'EE_RDN', folder, 'xlsx')
+
+    @unittest.skipUnless(HAS_PYARROW, 'pyarrow is not installed')
+    def test_save_data_columnar(self):
+        df = pd.DataFrame({'Data': ['30-11-2022', '01-12-2022'], 'Kurs': ['1,5', '2,5']})
+        with tempfile.TemporaryDirectory() as folder:
+            paths = fetch_data.save_data(df, 'EE_RDN', folder, 'parquet')
+            saved = pd.read_parquet(paths[0])
+            self.assertListEqual(saved['Kurs'].tolist(), [1.5, 2.5])
+            self.assertTrue(pd.api.types.is_datetime64_any_dtype(saved['Data']))
+
+            paths = fetch_data.save_data(df, 'EE_RDN', folder, 'feather', True, 'EE_RDN')
+            self.assertEqual(len(paths), 2)
+            self.assertListEqual(pd.read_feather(paths[1])['Kurs'].tolist(), [2.5])
+
+    def test_save_data_chunks(self):
+        fetcher = fetch_data.Fetcher(session=FakePseSession())
+        with tempfile.TemporaryDirectory() as folder:
+            expected = fetch_data.get_source_data(1, '2022-11-01', '2022-12-31', fetcher=fetcher)
+            chunks = fetch_data.iter_source_data(1, '2022-11-01', '2022-12-31', fetcher=fetcher)
+            paths = fetch_data.save_data_chunks(chunks, 'PL_WYK_KSE', folder)
+            self.assertListEqual(paths, [os.path.join(folder, 'PL_WYK_KSE.csv')])
+            with open(paths[0], encoding='utf-8') as file:
+                self.assertEqual(file.read(), expected.to_csv(index=False))
+
+            paths = fetch_data.save_data_chunks(iter([]), 'empty', folder)
+            self.assertListEqual(paths, [])
+            chunks = fetch_data.iter_source_data(1, '2022-12-31', '2022-11-01', fetcher=fetcher)
+            with self.assertRaises(Exception):
+                fetch_data.save_data_chunks(chunks, 'wrong', folder)
+            self.assertFalse(os.path.exists(os.path.join(folder, 'wrong.csv')))
+
+            if HAS_PYARROW:
+                for file_format in ['parquet', 'feather']:
+                    chunks = fetch_data.iter_source_data(1, '2022-11-01', '2022-12-31', fetcher=fetcher)
+                    paths = fetch_data.save_data_chunks(chunks, 'PL_WYK_KSE', folder, file_format)
+                    read = pd.read_parquet if file_format == 'parquet' else pd.read_feather
+                    pd.testing.assert_frame_equal(read(paths[0]), fetch_data.convert_types(expected))
+
+    @unittest.skipUnless(HAS_PYARROW, 'pyarrow is not installed')
+    def test_save_data_chunks_missing_values(self):
+        header, columns = fetch_data.extract_rdn_table(read_rdn_html())
+        missing = [columns[0]] + [['-'] * len(column) for column in columns[1:]]
+        chunks = [fetch_data.create_rdn_dataframe(['02-12-2022'], [(header, missing)]),
+                  fetch_data.create_rdn_dataframe(['03-12-2022'], [(header, columns)])]
+        with tempfile.TemporaryDirectory() as folder:
+            for file_format in ['parquet', 'feather']:
+                path = fetch_data.save_data(pd.concat(chunks, ignore_index=True), 'expected', folder, file_format)[0]
+                paths = fetch_data.save_data_chunks(iter(chunks), 'EE_RDN', folder, file_format)
+                read = pd.read_parquet if file_format == 'parquet' else pd.read_feather
+                pd.testing.assert_frame_equal(read(paths[0]), read(path))
+                self.assertTrue(read(paths[0])[header[2]].iloc[:24].isna().all())
 
     def test_save_to_csv(self):
         pass